@@ -12,9 +12,31 @@ from JominiTools.src import (
     JominiShowTextureBase,
     open_path,
     get_views_with_shown_textures,
+    update_view_index,
+    remove_view_index,
+    update_declaration_indexes,
+    update_reference_indexes,
 )
 
 
+class JominiViewIndexListener(sublime_plugin.TextChangeListener):
+    """
+    Keeps the per view indexes used by plugin features up to date with every edit
+    """
+
+    def on_text_changed(self, changes):
+        update_view_index(self.buffer, changes)
+
+
+class JominiViewIndexEventListener(sublime_plugin.EventListener):
+    def on_close(self, view):
+        remove_view_index(view)
+
+    def on_post_save_async(self, view):
+        update_declaration_indexes(view)
+        update_reference_indexes(view)
+
+
 class GotoScriptObjectDefinitionCommand(sublime_plugin.WindowCommand):
     def run(self, path: str, line: str):  # type: ignore
         if os.path.exists(path):
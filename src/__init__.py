@@ -1,11 +1,21 @@
 from .autocomplete import JominiAutoComplete
 from .css import CSS
 from .data_system import JominiDataSystemEventListener
+from .debounce import Debouncer
+from .declaration_index import (
+    DeclarationIndex,
+    get_declaration_index,
+    update_declaration_indexes,
+)
 from .encoding import encoding_check
 from .event_listener import JominiEventListener
 from .game_data import JominiGameData
-from .game_object_manager import GameObjectData, JominiGameObjectManager
-from .game_objects import write_syntax
+from .game_object_manager import (
+    GameObjectData,
+    JominiGameObjectManager,
+    JominiGameObjectStore,
+)
+from .game_objects import write_syntax, write_syntax_file
 from .hover import Hover
 from .jomini import (
     PdxScriptObject,
@@ -13,6 +23,20 @@ from .jomini import (
     GameObjectBase,
     dict_to_game_object,
 )
+from .reference_index import (
+    ReferenceIndex,
+    GuiReferenceIndex,
+    JominiFindAllReferencesCommand,
+    get_reference_index,
+    get_gui_reference_index,
+    update_reference_indexes,
+)
+from .scheduler import (
+    JobScheduler,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_INDEXING,
+    PRIORITY_CACHE_FLUSH,
+)
 from .scope_match import ScopeMatch
 from .textures import (
     JominiShowAllTexturesCommand,
@@ -21,6 +45,7 @@ from .textures import (
     JominiShowTextureBase,
     get_views_with_shown_textures,
 )
+from .parse_tree import ParseTree
 from .plugin import JominiPlugin
 from .tiger import TigerJsonObject
 from .tiger_plugin import (
@@ -30,4 +55,10 @@ from .tiger_plugin import (
     JominiTigerOutputCommand,
     JominiRunTigerCommand,
 )
+from .view_index import (
+    ViewIndex,
+    get_view_index,
+    update_view_index,
+    remove_view_index,
+)
 from .utils import *
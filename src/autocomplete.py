@@ -2,10 +2,12 @@
 Code for autocomplete features of a plugin
 """
 
+import re
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
 
 import sublime
-from .utils import get_index
+from .view_index import ViewIndex, get_view_index
 
 auto_complete_fields_example = {
     "example": [],
@@ -14,9 +16,14 @@ selector_flag_pairs_example = [
     ("meta.op.mod.bracket", "opinion", "modifier = "),
     ("meta.trait.bracket", "trait"),
 ]
+# Key of the statement whose value is being typed at the end of a line
+value_key_re = re.compile(r"([\w.:$@]+)\s*=\s*$")
 
 
 class JominiAutoComplete(ABC):
+    key_path_classifier: Optional["KeyPathClassifier"] = None
+    selector_classifier: Optional["SelectorClassifier"] = None
+
     def __init__(
         self,
         auto_complete_fields=auto_complete_fields_example,
@@ -44,33 +51,237 @@ class JominiAutoComplete(ABC):
         selector: str,
         flag_name: str,
         view: sublime.View,
-        view_str: str,
+        index: ViewIndex,
         point: int,
         string_check_and_move=None,
     ):
-        for br in view.find_by_selector(selector):
-            i = sublime.Region(br.a, get_index(view_str, br.a))
-            s = view.substr(i)
-            if string_check_and_move and string_check_and_move in s:
-                fpoint = (
-                    s.index(string_check_and_move) + len(string_check_and_move)
-                ) + i.a
-                if fpoint == point:
-                    setattr(self, flag_name, True)
-                    view.run_command("auto_complete")
-            elif i.contains(point) and not string_check_and_move:
+        if string_check_and_move:
+            # The cursor also has to be right after the string
+            start = point - len(string_check_and_move)
+            if view.substr(sublime.Region(start, point)) != string_check_and_move:
+                return
+
+        # The cursor is in a block of the selector if one of its enclosing blocks matches
+        for row, col in index.get_enclosing_brackets(*view.rowcol(point)):
+            if view.match_selector(view.text_point(row, col), selector):
                 setattr(self, flag_name, True)
                 view.run_command("auto_complete")
+                return
 
     def check_for_complex_completions(self, view: sublime.View, point: int):
-        view_str = view.substr(sublime.Region(0, view.size()))
+        index = get_view_index(view)
+
+        if self.key_path_classifier:
+            row, col = view.rowcol(point)
+            match = value_key_re.search(view.substr(view.line(point))[:col])
+            flag = self.key_path_classifier.classify(
+                index.get_key_path(row, col), match.group(1) if match else None
+            )
+            if flag is not None:
+                setattr(self, flag, True)
+                view.run_command("auto_complete")
+            return
+
+        if self.selector_classifier is not None:
+            brackets = index.get_enclosing_brackets(*view.rowcol(point))
+            flags = self.selector_classifier.classify(view, brackets, point)
+            for flag in flags:
+                setattr(self, flag, True)
+            if flags:
+                view.run_command("auto_complete")
+            return
 
         for pair in self.selector_flag_pairs:
             if len(pair) == 3:
                 selector, flag, string_check_and_move = pair
                 self.check_region_and_set_flag(
-                    selector, flag, view, view_str, point, string_check_and_move
+                    selector, flag, view, index, point, string_check_and_move
                 )
             else:
                 selector, flag = pair
-                self.check_region_and_set_flag(selector, flag, view, view_str, point)
+                self.check_region_and_set_flag(selector, flag, view, index, point)
+
+
+class SimpleCompletionMatcher:
+    """
+    The simple completion pattern tables compiled once into a single matcher.
+    All the `<keyword> = ` patterns are one regex, so finding the keyword before the cursor is a single pass over the line.
+    Scope patterns like `culture:` are looked up by their length, so only one dictionary lookup is done per distinct pattern length.
+    """
+
+    def __init__(
+        self,
+        pattern_flag_pairs: List[Tuple[List[str], str]],
+        scope_pattern_flag_pairs: List[Tuple[str, str]],
+    ):
+        # The first flag a pattern is paired with wins, the same as looping over the pairs in order
+        self.pattern_flags: Dict[str, str] = dict()
+        for patterns, flag in pattern_flag_pairs:
+            for pattern in patterns:
+                self.pattern_flags.setdefault(pattern, flag)
+
+        self.regex = None
+        if self.pattern_flags:
+            alternation = "|".join(
+                sorted(self.pattern_flags, key=lambda x: len(x), reverse=True)
+            )
+            self.regex = re.compile(rf'\b({alternation})\s?=\s?(")?')
+
+        self.scope_pattern_flags: Dict[str, List[str]] = dict()
+        for pattern, flag in scope_pattern_flag_pairs:
+            self.scope_pattern_flags.setdefault(pattern, []).append(flag)
+        self.scope_pattern_lengths = sorted(
+            {len(x) for x in self.scope_pattern_flags}, reverse=True
+        )
+
+    def match(self, line: str, column: int) -> Optional[str]:
+        """
+        Return the flag of the `<keyword> = ` pattern that the cursor at column is the value of
+        The cursor can be up to 3 characters after the end of the keyword, or 4 if the value is quoted.
+        """
+        if self.regex is None:
+            return None
+
+        for match in self.regex.finditer(line):
+            distance = column - match.end(1)
+            if distance == 2 or distance == 3 or (distance == 4 and match.group(2)):
+                key = match.group(1)
+                flag = self.pattern_flags.get(key)
+                return flag if flag is not None else self.get_regex_flag(key)
+            if match.start() > column:
+                break
+        return None
+
+    def get_regex_flag(self, key: str) -> Optional[str]:
+        # Patterns can be regexes themselves, so the key that matched might not be a pattern
+        for pattern, flag in self.pattern_flags.items():
+            if re.fullmatch(pattern, key):
+                return flag
+        return None
+
+    def match_scope(self, line: str, column: int) -> List[str]:
+        """Return the flags of all the scope patterns that end right at the cursor"""
+        prefix = line[:column]
+        flags = list()
+        for length in self.scope_pattern_lengths:
+            if length > len(prefix):
+                continue
+            flags.extend(self.scope_pattern_flags.get(prefix[-length:], ()))
+        return flags
+
+
+class KeyPathNode:
+    __slots__ = ("children", "flag", "value_flags")
+
+    def __init__(self):
+        self.children: Dict[str, KeyPathNode] = dict()
+        self.flag: Optional[str] = None
+        # Statement key -> flag
+        self.value_flags: Dict[str, str] = dict()
+
+
+class KeyPathClassifier:
+    """
+    The key path completion tables compiled into a trie of block keys that starts at the innermost block.
+    Classifying the cursor walks the trie along the blocks around it, so the cost depends on how deep the cursor is and not on the number of key paths.
+    """
+
+    def __init__(self, key_path_flag_pairs: List[Tuple]):
+        self.root = KeyPathNode()
+        for pair in key_path_flag_pairs:
+            node = self.root
+            for key in reversed(pair[0]):
+                node = node.children.setdefault(key, KeyPathNode())
+            # The first flag a key path is paired with wins, the same as looping over the pairs in order
+            if len(pair) == 3:
+                node.value_flags.setdefault(pair[2].strip(" ="), pair[1])
+            elif node.flag is None:
+                node.flag = pair[1]
+
+    def __bool__(self) -> bool:
+        return bool(self.root.children)
+
+    def classify(
+        self, key_path: List[Optional[str]], value_key: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Return the flag of the longest key path that ends at the innermost block that has one
+        Key paths with a statement key take precedence over the ones without at the same block.
+        """
+        for end in range(len(key_path) - 1, -1, -1):
+            node: Optional[KeyPathNode] = self.root
+            flag = None
+            for i in range(end, -1, -1):
+                node = node.children.get(key_path[i])  # type: ignore
+                if node is None:
+                    break
+                found = node.value_flags.get(value_key) if value_key else None
+                if found is None:
+                    found = node.flag
+                if found is not None:
+                    flag = found
+            if flag is not None:
+                return flag
+        return None
+
+
+def is_simple_selector(selector: str) -> bool:
+    return bool(selector) and not any(x in selector for x in " ,|&()-")
+
+
+def is_after_string(view: sublime.View, point: int, string: Optional[str]) -> bool:
+    if not string:
+        return True
+    return view.substr(sublime.Region(point - len(string), point)) == string
+
+
+class SelectorClassifier:
+    """
+    The selector completion pairs compiled into a dictionary of scope -> pairs.
+    Selectors that are a single scope are looked up with the scope names at the { of each block around the cursor,
+    so the cost depends on how deep the cursor is and not on the number of pairs.
+    Other selectors are still checked one at a time with match_selector.
+    """
+
+    def __init__(self, selector_flag_pairs: List[Tuple]):
+        # Scope -> (flag, string that has to be right before the cursor)
+        self.scope_pairs: Dict[str, List[Tuple[str, Optional[str]]]] = dict()
+        self.complex_pairs: List[Tuple[str, str, Optional[str]]] = list()
+        for pair in selector_flag_pairs:
+            selector, flag = pair[0].strip(), pair[1]
+            string_check = pair[2] if len(pair) == 3 else None
+            if is_simple_selector(selector):
+                self.scope_pairs.setdefault(selector, []).append((flag, string_check))
+            else:
+                self.complex_pairs.append((selector, flag, string_check))
+
+    def classify(
+        self, view: sublime.View, brackets: List[Tuple[int, int]], point: int
+    ) -> List[str]:
+        """
+        Return the flags of every pair that matches one of the blocks at brackets
+        """
+        flags: List[str] = list()
+        for row, col in brackets:
+            bracket_point = view.text_point(row, col)
+            for scope in view.scope_name(bracket_point).split():
+                # A selector matches a scope if it is the scope or starts the scope followed by a .
+                parts = scope.split(".")
+                for i in range(1, len(parts) + 1):
+                    pairs = self.scope_pairs.get(".".join(parts[:i]))
+                    if pairs is None:
+                        continue
+                    for flag, string_check in pairs:
+                        if flag not in flags and is_after_string(
+                            view, point, string_check
+                        ):
+                            flags.append(flag)
+
+            for selector, flag, string_check in self.complex_pairs:
+                if (
+                    flag not in flags
+                    and view.match_selector(bracket_point, selector)
+                    and is_after_string(view, point, string_check)
+                ):
+                    flags.append(flag)
+        return flags
@@ -1,8 +1,65 @@
 # Class to hold css styles for sublime plugin
 
 import os
+import time
+from typing import Dict, Tuple
+
 import sublime
 
+style_names = ("default", "effect", "trigger", "scope", "dark")
+
+# Style name -> (modification time, stylesheet), shared by every CSS object
+style_cache: Dict[str, Tuple[float, str]] = dict()
+# Stylesheets are checked for changes at most once per interval (in seconds)
+STYLE_CHECK_INTERVAL = 2.0
+last_style_check = 0.0
+# Body id -> popup html with the default stylesheet already filled in
+popup_templates: Dict[str, str] = dict()
+
+
+def get_style_path(name: str) -> str:
+    return os.path.join(sublime.packages_path(), f"JominiTools/src/styles/{name}.css")
+
+
+def load_styles():
+    """
+    Read the stylesheets whose modification time changed since they were last read
+    """
+    global last_style_check
+
+    now = time.monotonic()
+    if style_cache and now - last_style_check < STYLE_CHECK_INTERVAL:
+        return
+    last_style_check = now
+
+    for name in style_names:
+        path = get_style_path(name)
+        mtime = os.path.getmtime(path)
+        cached = style_cache.get(name)
+        if cached is not None and cached[0] == mtime:
+            continue
+        with open(path, "r") as file:
+            style_cache[name] = (mtime, file.read())
+        if name == "default":
+            popup_templates.clear()
+
+
+def get_popup_template(body_id="jomini-body") -> str:
+    """
+    Return the html skeleton of a popup that uses the default stylesheet, the body content is filled in with %
+    """
+    load_styles()
+    template = popup_templates.get(body_id)
+    if template is None:
+        style = style_cache["default"][1].replace("%", "%%")
+        template = f'<body id="{body_id}"><style>{style}</style>%s</body>'
+        popup_templates[body_id] = template
+    return template
+
+
+def make_popup(content: str, body_id="jomini-body") -> str:
+    return get_popup_template(body_id) % content
+
 
 class CSS:
     def __init__(self):
@@ -14,33 +71,9 @@ class CSS:
         self.get_styles()
 
     def get_styles(self):
-        default_path = os.path.join(
-            os.path.join(
-                sublime.packages_path(),
-                "JominiTools/src/styles/default.css",
-            )
-        )
-        effect_path = os.path.join(
-            sublime.packages_path(), "JominiTools/src/styles/effect.css"
-        )
-        trigger_path = os.path.join(
-            sublime.packages_path(),
-            "JominiTools/src/styles/trigger.css",
-        )
-        scope_path = os.path.join(
-            sublime.packages_path(), "JominiTools/src/styles/scope.css"
-        )
-        dark_path = os.path.join(
-            sublime.packages_path(), "JominiTools/src/styles/dark.css"
-        )
-
-        with open(default_path, "r") as file:
-            self.default = file.read()
-        with open(effect_path, "r") as file:
-            self.effect = file.read()
-        with open(trigger_path, "r") as file:
-            self.trigger = file.read()
-        with open(scope_path, "r") as file:
-            self.scope = file.read()
-        with open(dark_path, "r") as file:
-            self.dark = file.read()
+        load_styles()
+        self.default = style_cache["default"][1]
+        self.effect = style_cache["effect"][1]
+        self.trigger = style_cache["trigger"][1]
+        self.scope = style_cache["scope"][1]
+        self.dark = style_cache["dark"][1]
@@ -3,11 +3,12 @@ Plugin features related to the game's data system functions.
 Data system features that are not coupled to game objects should go here.
 """
 
-from typing import List
+from typing import List, Set
 from abc import ABC, abstractmethod
 
 import sublime
 
+from .declaration_index import get_declaration_index
 from .plugin import JominiPlugin
 from .utils import IterViews, get_syntax_name
 
@@ -67,15 +68,17 @@ class JominiDataSystemEventListener(ABC):
                 )
 
     def get_prompt_completions(self, kind: str, selector: str):
-        found_words = set()
-
-        for view in IterViews(sublime.windows()):
-            if get_syntax_name(view) != self.plugin.script_syntax_name:
-                continue
+        index = get_declaration_index(
+            self.plugin.name, self.plugin.settings.get("PathsToModFiles") or []
+        )
+        if kind == "Scope":
+            found_words = set(index.get_scopes())
+        else:
+            found_words = set(index.get_variables())
 
-            scope_regions = view.find_by_selector(selector)
-            for region in scope_regions:
-                found_words.add(view.substr(region))
+        # Open views are only searched while the index is being built the first time
+        if not index.files:
+            found_words.update(self.get_open_view_declarations(selector))
 
         if not found_words:
             return None
@@ -93,3 +96,16 @@ class JominiDataSystemEventListener(ABC):
             flags=sublime.INHIBIT_EXPLICIT_COMPLETIONS
             | sublime.INHIBIT_WORD_COMPLETIONS,
         )
+
+    def get_open_view_declarations(self, selector: str) -> Set[str]:
+        found_words = set()
+
+        for view in IterViews(sublime.windows()):
+            if get_syntax_name(view) != self.plugin.script_syntax_name:
+                continue
+
+            scope_regions = view.find_by_selector(selector)
+            for region in scope_regions:
+                found_words.add(view.substr(region))
+
+        return found_words
@@ -0,0 +1,38 @@
+"""
+Debouncing for handlers that run on every cursor movement or modification.
+Only the latest call per view and key runs once the view has been idle for the delay, older calls are dropped.
+Calls are also dropped if the buffer changed after they were made since their cursor state is stale.
+"""
+
+from typing import Callable, Dict, Tuple
+
+import sublime
+
+
+class Debouncer:
+    def __init__(self):
+        # (view id, key) -> generation of the latest call
+        self.generations: Dict[Tuple[int, str], int] = dict()
+
+    def call(self, view: sublime.View, key: str, callback: Callable, delay: int):
+        token = (view.id(), key)
+        generation = self.generations.get(token, 0) + 1
+        self.generations[token] = generation
+        change_count = view.change_count()
+
+        def run():
+            if self.generations.get(token) != generation:
+                # A newer call was made while this one was waiting
+                return
+            del self.generations[token]
+
+            if not view.is_valid() or view.change_count() != change_count:
+                return
+
+            callback()
+
+        sublime.set_timeout_async(run, delay)
+
+    def is_stale(self, view: sublime.View, change_count: int) -> bool:
+        """Results computed for change_count should be dropped if this is True"""
+        return not view.is_valid() or view.change_count() != change_count
@@ -0,0 +1,171 @@
+"""
+Index of the saved scopes and variables that are declared in the script files of a mod.
+The index is built in the background the first time it is needed and then kept up to date from saved files,
+files are only read again when their modification time changes.
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import sublime
+
+from .utils import normalize_path
+
+comment_re = re.compile(r"#.*")
+scope_declaration_re = re.compile(
+    r"\bsave_(?:temporary_)?scope_as\s*=\s*([\w$.:@]+)"
+    r"|\bsave_(?:temporary_)?scope_value_as\s*=\s*\{[^{}]*?\bname\s*=\s*([\w$.:@]+)"
+)
+variable_declaration_re = re.compile(
+    r"\bset_(?:local_|global_)?variable\s*=\s*(?:\{[^{}]*?\bname\s*=\s*)?([\w$.:@]+)"
+)
+# Keys of the statements that declare a saved scope or variable, the same ones the regexes above match.
+# The name is the value of the statement or of the name = ... statement in its block.
+scope_declaration_keys = {
+    "save_scope_as",
+    "save_temporary_scope_as",
+    "save_scope_value_as",
+    "save_temporary_scope_value_as",
+}
+variable_declaration_keys = {
+    "set_variable",
+    "set_local_variable",
+    "set_global_variable",
+}
+declaration_keys = scope_declaration_keys | variable_declaration_keys
+
+
+def get_declarations(text: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Return the saved scope and variable names declared in text
+    """
+    text = comment_re.sub("", text)
+    scopes = set()
+    for match in scope_declaration_re.finditer(text):
+        scopes.add(match.group(1) or match.group(2))
+    variables = {x.group(1) for x in variable_declaration_re.finditer(text)}
+    return scopes, variables
+
+
+class DeclarationIndex:
+    def __init__(self):
+        self.roots: Tuple[str, ...] = tuple()
+        # Normalized path -> (modification time, scopes, variables)
+        self.files: Dict[str, Tuple[float, Set[str], Set[str]]] = dict()
+        self.scopes: Counter = Counter()
+        self.variables: Counter = Counter()
+        self.building = False
+        self.lock = threading.Lock()
+
+    def is_indexed_path(self, path: str) -> bool:
+        path = normalize_path(path)
+        return path.endswith(".txt") and any(
+            path.startswith(normalize_path(x) + os.sep) for x in self.roots
+        )
+
+    def build(self, roots: Iterable[str]):
+        """
+        Index every script file under roots, files that didn't change since they were last indexed are skipped
+        """
+        self.roots = tuple(x for x in roots if x)
+        found = set()
+        for root in self.roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                for filename in filenames:
+                    if not filename.endswith(".txt"):
+                        continue
+                    path = normalize_path(os.path.join(dirpath, filename))
+                    found.add(path)
+                    self.update_file(path)
+
+        for path in [x for x in self.files if x not in found]:
+            self.remove_file(path)
+        self.building = False
+
+    def update_file(self, path: str, text: Optional[str] = None):
+        path = normalize_path(path)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.remove_file(path)
+            return
+
+        entry = self.files.get(path)
+        if text is None:
+            if entry is not None and entry[0] == mtime:
+                return
+            try:
+                with open(path, "r", encoding="utf-8-sig") as file:
+                    text = file.read()
+            except (OSError, UnicodeDecodeError):
+                return
+
+        scopes, variables = get_declarations(text)
+        with self.lock:
+            self._remove_file_locked(path)
+            self.files[path] = (mtime, scopes, variables)
+            self.scopes.update(scopes)
+            self.variables.update(variables)
+
+    def remove_file(self, path: str):
+        path = normalize_path(path)
+        with self.lock:
+            self._remove_file_locked(path)
+
+    def _remove_file_locked(self, path: str):
+        # Must be called with self.lock held
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        self.scopes.subtract(entry[1])
+        self.variables.subtract(entry[2])
+        for counter in (self.scopes, self.variables):
+            for key in [x for x in counter if counter[x] <= 0]:
+                del counter[key]
+
+    def get_scopes(self) -> List[str]:
+        with self.lock:
+            return list(self.scopes)
+
+    def get_variables(self) -> List[str]:
+        with self.lock:
+            return list(self.variables)
+
+
+# Plugin name -> DeclarationIndex
+declaration_indexes: Dict[str, DeclarationIndex] = dict()
+
+
+def get_declaration_index(plugin_name: str, roots: Iterable[str]) -> DeclarationIndex:
+    """
+    Get the declaration index of a plugin, if it hasn't been built for roots yet a build is started on the async thread
+    """
+    roots = tuple(x for x in roots if x)
+    index = declaration_indexes.get(plugin_name)
+    if index is None:
+        index = DeclarationIndex()
+        declaration_indexes[plugin_name] = index
+
+    if index.roots != roots and not index.building:
+        index.building = True
+        index.roots = roots
+        sublime.set_timeout_async(lambda: index.build(roots), 0)
+
+    return index
+
+
+def update_declaration_indexes(view: sublime.View):
+    """
+    Update every declaration index that includes the file of view, used after a view is saved
+    """
+    path = view.file_name()
+    if not path:
+        return
+
+    for index in declaration_indexes.values():
+        if index.is_indexed_path(path):
+            text = view.substr(sublime.Region(0, view.size()))
+            sublime.set_timeout_async(lambda index=index: index.update_file(path, text))
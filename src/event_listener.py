@@ -3,19 +3,34 @@ The main event listener for the plugin, this is where most of the plugin feature
 The init function of the event listener is treated as the main entry point for the plugin.
 """
 
-import re
+import os
 import inspect
 from abc import ABC, abstractmethod
-from typing import Set, Union, List, Tuple
+from typing import Callable, Dict, FrozenSet, Optional, Set, Union, List, Tuple
 
 import sublime
 
+from .autocomplete import (
+    KeyPathClassifier,
+    SelectorClassifier,
+    SimpleCompletionMatcher,
+)
+from .debounce import Debouncer
 from .game_data import JominiGameData
 from .game_objects import JominiGameObject
-from .game_object_manager import JominiGameObjectManager
-from .utils import get_file_name, get_syntax_name
+from .game_object_manager import JominiGameObjectManager, JominiGameObjectStore
+from .utils import get_file_name, get_syntax_name, is_file_in_directory
 from .plugin import JominiPlugin
-from .jomini import PdxScriptObject
+from .jomini import PdxScriptObject, create_file_parser, parses_single_files
+from .view_index import get_view_index, workspace_token_counts
+from .profiler import StartupProfiler
+from .reference_index import get_gui_reference_index, get_reference_index
+from .scheduler import (
+    JobScheduler,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_INDEXING,
+    PRIORITY_CACHE_FLUSH,
+)
 
 
 class JominiEventListener(ABC):
@@ -111,46 +126,119 @@ class JominiEventListener(ABC):
             return None
 
     def init(self, plugin: JominiPlugin):
-        self.auto_complete_fields = dict()  # must be before init_autocomplete
-        self.init_hover(plugin.script_syntax_name, plugin.localization_syntax_name)
-        self.init_game_object_manager()
-        self.init_game_data()
-        self.init_autocomplete(
-            self.game_data.auto_complete_fields,
-            self.game_data.auto_complete_selector_flag_pairs,
+        """
+        Startup is split into phases, only the setup needed to handle the first keystroke runs synchronously.
+        Checking for changes, loading game objects, and writing the color scheme are deferred to the async thread.
+        """
+        self.profiler = StartupProfiler(
+            plugin.name, bool(plugin.settings.get("ProfileStartup"))
         )
-        self.game_objects = self.manager.get_default_game_objects()
-        self.plugin = plugin
-        self.settings = plugin.settings
-        self.game_files_path = self.settings.get("GameFilesPath")
-        self.mod_files: List = self.settings.get("PathsToModFiles")  # type: ignore
-        self.jomini_game_object = JominiGameObject(plugin.name)
-
-        syntax_changes = self.jomini_game_object.check_for_syntax_changes()
-        changed_objects_set = self.jomini_game_object.check_mod_for_changes(
-            self.mod_files,
-            self.manager.get_dir_to_game_object_dict(),
-            self.manager.get_game_object_dirs(),
+        with self.profiler.phase("setup"):
+            self.auto_complete_fields = dict()  # must be before init_autocomplete
+            self.init_hover(plugin.script_syntax_name, plugin.localization_syntax_name)
+            self.init_game_object_manager()
+            self.init_game_data()
+            self.init_autocomplete(
+                self.game_data.auto_complete_fields,
+                self.game_data.auto_complete_selector_flag_pairs,
+            )
+            self.simple_completion_matcher = SimpleCompletionMatcher(
+                self.game_data.simple_completion_pattern_flag_pairs,  # type: ignore
+                self.game_data.simple_completion_scope_pattern_flag_pairs,  # type: ignore
+            )
+            self.key_path_classifier = KeyPathClassifier(
+                self.game_data.auto_complete_key_path_flag_pairs  # type: ignore
+            )
+            self.selector_classifier = SelectorClassifier(
+                self.game_data.auto_complete_selector_flag_pairs  # type: ignore
+            )
+            self.game_objects = JominiGameObjectStore(
+                self.manager.get_default_game_objects()
+            )
+            # Flag name -> (keys, completion items, trigger -> completion item)
+            self.completion_cache: Dict[
+                str,
+                Tuple[
+                    FrozenSet[str],
+                    List[sublime.CompletionItem],
+                    Dict[str, sublime.CompletionItem],
+                ],
+            ] = dict()
+            # Flag name -> ((buffer id, change count), unranked items, ranked items)
+            self.ranked_completion_cache: Dict[
+                str,
+                Tuple[
+                    Tuple[int, int],
+                    List[sublime.CompletionItem],
+                    List[sublime.CompletionItem],
+                ],
+            ] = dict()
+            self.game_objects.add_observer(self.invalidate_completions)
+            self.plugin = plugin
+            self.gui_reference_index = get_gui_reference_index(plugin.name)
+            self.settings = plugin.settings
+            self.popup_reference_limit = self.settings.get("PopupReferenceLimit", 10)
+            self.game_files_path = self.settings.get("GameFilesPath")
+            self.mod_files: List = self.settings.get("PathsToModFiles")  # type: ignore
+            self.jomini_game_object = JominiGameObject(plugin.name)
+            self.scheduler = JobScheduler()
+            self.debouncer = Debouncer()
+            self.force_syntax_write = False
+
+        self.scheduler.schedule(
+            lambda: self.load_game_objects(), PRIORITY_INDEXING, "load_game_objects"
         )
-        if len(self.jomini_game_object.load_game_objects_json()) != len(
-            self.game_objects
-        ):
+
+    def load_game_objects(self):
+        """
+        Deferred part of startup, loads game objects from the cache or creates them if they are out of date
+        """
+        with self.profiler.phase("check_for_syntax_changes"):
+            syntax_changes = self.jomini_game_object.check_for_syntax_changes()
+        # If the syntax file itself changed it has to be written even if no keys did
+        self.force_syntax_write = syntax_changes
+        with self.profiler.phase("check_mod_for_changes"):
+            changed_objects_set = self.jomini_game_object.check_mod_for_changes(
+                self.mod_files,
+                self.manager.get_dir_to_game_object_dict(),
+                self.manager.get_game_object_dirs(),
+            )
+        with self.profiler.phase("load_game_objects_json"):
+            cached_objects = self.jomini_game_object.load_game_objects_json()
+
+        if len(cached_objects) != len(self.game_objects):
             # Create all objects for the first time
-            sublime.set_timeout_async(lambda: self.create_all_game_objects(), 0)
-            sublime.set_timeout_async(lambda: self.post_game_object_creation(), 0)
-            sublime.active_window().run_command("run_tiger")
+            self.scheduler.schedule(
+                self.profiler.wrap(
+                    "create_all_game_objects", lambda: self.create_all_game_objects()
+                ),
+                PRIORITY_INDEXING,
+                "create_all_game_objects",
+            )
+            self.scheduler.schedule(
+                lambda: self.post_game_object_creation(),
+                PRIORITY_INDEXING,
+                "post_game_object_creation",
+            )
+            sublime.set_timeout(
+                lambda: sublime.active_window().run_command("run_tiger"), 0
+            )
         elif changed_objects_set:
-            self.load_changed_objects(changed_objects_set)
-            sublime.active_window().run_command("run_tiger")
+            with self.profiler.phase("get_objects_from_cache"):
+                self.load_changed_objects(changed_objects_set)
+            sublime.set_timeout(
+                lambda: sublime.active_window().run_command("run_tiger"), 0
+            )
         else:
             # Load cached objects
-            self.game_objects = self.jomini_game_object.get_objects_from_cache(
-                self.manager.get_default_game_objects()
-            )
-            if syntax_changes:
-                sublime.set_timeout_async(
-                    lambda: self.write_data_to_syntax(self.game_objects), 0
+            with self.profiler.phase("get_objects_from_cache"):
+                self.game_objects.update(
+                    self.jomini_game_object.get_objects_from_cache(
+                        self.manager.get_default_game_objects(), cached_objects
+                    )
                 )
+            if syntax_changes:
+                self.schedule_syntax_write()
 
         # Uncomment this and use the output to balance the load between the threads in create_all_game_objects
         # from .utils import print_load_balanced_game_object_creation
@@ -158,26 +246,92 @@ class JominiEventListener(ABC):
         #     lambda: print_load_balanced_game_object_creation(self.game_objects), 0
         # )
 
-        self.jomini_game_object.add_color_scheme_scopes()
+        with self.profiler.phase("add_color_scheme_scopes"):
+            self.jomini_game_object.add_color_scheme_scopes()
+
+        self.schedule_reference_index_build()
+        self.schedule_profiler_report()
+
+    def schedule_syntax_write(self, force=False):
+        # Coalesced so several changes in a row only write the syntax once
+        self.force_syntax_write = self.force_syntax_write or force
+        self.scheduler.schedule(
+            self.profiler.wrap(
+                "write_data_to_syntax", lambda: self.write_changed_syntax()
+            ),
+            PRIORITY_INDEXING,
+            "write_data_to_syntax",
+        )
+
+    def write_changed_syntax(self):
+        """
+        Only write the syntax if the keys of a game object changed since the last write or if a write is forced.
+        Plugins should write the file with write_syntax_file so identical output doesn't touch the syntax file.
+        """
+        force = self.force_syntax_write
+        self.force_syntax_write = False
+        if not force and not self.jomini_game_object.get_changed_syntax_objects(
+            self.game_objects
+        ):
+            return
+
+        self.write_data_to_syntax(self.game_objects)
+        self.jomini_game_object.save_syntax_hashes(self.game_objects)
+
+    def schedule_object_cache_write(self):
+        self.scheduler.schedule(
+            self.profiler.wrap(
+                "cache_all_objects",
+                lambda: self.jomini_game_object.cache_all_objects(self.game_objects),
+            ),
+            PRIORITY_CACHE_FLUSH,
+            "cache_all_objects",
+        )
+
+    def schedule_reference_index_build(self):
+        # The index is built on its own threads, this only delays starting it until the startup work is done
+        roots = (self.mod_files or []) + [self.game_files_path]
+
+        def build():
+            get_reference_index(self.plugin.name).build_async(roots)
+            self.gui_reference_index.build_async(roots)
+
+        self.scheduler.schedule(build, PRIORITY_CACHE_FLUSH, "build_reference_index")
+
+    def schedule_profiler_report(self):
+        # Cache flush priority so the report is written after the startup work it measures
+        self.scheduler.schedule(
+            lambda: self.profiler.write_report(),
+            PRIORITY_CACHE_FLUSH,
+            "write_startup_report",
+        )
 
     def load_changed_objects(self, changed_objects_set: Set[str], write_syntax=True):
         # Load objects that have changed since they were last cached
-        self.game_objects = self.jomini_game_object.get_objects_from_cache(
-            self.manager.get_default_game_objects()
+        self.game_objects.update(
+            self.jomini_game_object.get_objects_from_cache(
+                self.manager.get_default_game_objects()
+            )
         )
 
-        sublime.set_timeout_async(
-            lambda: self.create_game_objects(changed_objects_set), 0
-        )
+        self.schedule_game_object_creation(changed_objects_set)
         if write_syntax:
-            sublime.set_timeout_async(
-                lambda: self.write_data_to_syntax(self.game_objects), 0
-            )
+            self.schedule_syntax_write()
 
         # Cache created objects
-        sublime.set_timeout_async(
-            lambda: self.jomini_game_object.cache_all_objects(self.game_objects), 0
-        )
+        self.schedule_object_cache_write()
+
+    def schedule_game_object_creation(self, changed_objects_set: Set[str]):
+        # Each object is its own job so interactive work can run between them
+        for i in changed_objects_set:
+            self.scheduler.schedule(
+                self.profiler.wrap(
+                    f"create_game_objects({i})",
+                    lambda name=i: self.create_game_objects({name}),
+                ),
+                PRIORITY_INDEXING,
+                ("create_game_object", i),
+            )
 
     def create_game_objects(
         self,
@@ -189,58 +343,209 @@ class JominiEventListener(ABC):
             class_ref = game_object_to_class_dict[i]
 
             # Jomini objects have to be called with the mod and game files paths since they are not known at the time of class creation.
-            is_jomini_object = (
-                True
-                if len(inspect.signature(class_ref.__init__).parameters.values()) == 3
-                else False
-            )
-            if is_jomini_object:
+            if self.is_jomini_object(class_ref):
                 self.game_objects[i] = class_ref(self.mod_files, self.game_files_path)
             else:
                 self.game_objects[i] = class_ref()
 
+    def is_jomini_object(self, class_ref: type) -> bool:
+        return (
+            True
+            if len(inspect.signature(class_ref.__init__).parameters.values()) == 3
+            else False
+        )
+
     def post_game_object_creation(self):
         # Write syntax data after creating objects so they actually exist when writing
-        sublime.set_timeout_async(
-            lambda: self.write_data_to_syntax(self.game_objects), 0
-        )
+        self.schedule_syntax_write()
         # Cache created objects
-        sublime.set_timeout_async(
-            lambda: self.jomini_game_object.cache_all_objects(self.game_objects), 0
-        )
+        self.schedule_object_cache_write()
         # Update hashes for each game object directory
-        sublime.set_timeout_async(
+        self.scheduler.schedule(
             lambda: self.jomini_game_object.check_mod_for_changes(
                 self.mod_files,
                 self.manager.get_dir_to_game_object_dict(),
                 self.manager.get_game_object_dirs(),
             ),
-            0,
+            PRIORITY_CACHE_FLUSH,
+            "update_mod_cache",
+        )
+        # Rewrite the startup report now that the objects have been created
+        self.schedule_profiler_report()
+
+    def on_post_save_async(self, view: sublime.View):
+        if not view:
+            return
+
+        if get_syntax_name(view) not in (
+            self.plugin.script_syntax_name,
+            self.plugin.gui_syntax_name,
+        ):
+            return
+
+        # Saving the same file again before the update runs replaces the stale update
+        self.scheduler.schedule(
+            lambda: self.update_game_objects_from_view(view),
+            PRIORITY_INTERACTIVE,
+            ("update_game_objects_from_view", view.id()),
         )
 
-    def create_completion_list(self, flag_name: str, completion_kind: str):
+    def get_game_objects_for_file(self, path: str) -> List[str]:
+        """
+        Get the names of all the game objects that are created from files in the same directory as path
+        """
+        file_dir = os.path.dirname(path)
+        roots = [x for x in (self.mod_files or []) if x]
+        if self.game_files_path:
+            roots.append(self.game_files_path)  # type: ignore
+
+        relative_dir = ""
+        for root in roots:
+            if is_file_in_directory(path, root):
+                relative_dir = os.path.relpath(file_dir, root)
+                break
+
+        if not relative_dir:
+            return []
+
+        names = list()
+        for i in self.manager.get_objects():
+            if relative_dir == i.path or relative_dir.startswith(i.path + os.sep):
+                names.append(i.name)
+        return names
+
+    def update_game_objects_from_view(self, view: sublime.View):
+        """
+        Reparse only the contents of view and replace that file's objects in all the game objects that use it.
+        The buffer is parsed with an instance of the game object's class that skips get_data, so no files are walked
+        and it works the same for game objects that were loaded from the cache.
+        Classes that only override get_pdx_object_list can't parse a single file, those are recreated in the background instead.
+        """
+        if not view.is_valid():
+            return
+
+        path = get_file_name(view)
+        names = self.get_game_objects_for_file(path)
+        if not names:
+            return
+
+        filename = os.path.basename(path)
+        lines = view.substr(sublime.Region(0, view.size())).splitlines(True)
+        game_object_to_class_dict = self.manager.get_game_object_to_class_dict()
+        changed_objects = set()
+        rebuild_objects = set()
+        for i in names:
+            class_ref = game_object_to_class_dict[i]
+            if not parses_single_files(class_ref):
+                rebuild_objects.add(i)
+                continue
+            if self.is_jomini_object(class_ref):
+                parser = create_file_parser(class_ref, [], "")
+            else:
+                parser = create_file_parser(class_ref)
+
+            if filename in parser.ignored_files:
+                continue
+            if parser.included_files and filename not in parser.included_files:
+                continue
+
+            self.game_objects[i].replace_file_objects(
+                path, parser.get_file_pdx_objects(path, lines)
+            )
+            self.game_objects.notify(i)
+            changed_objects.add(i)
+
+        if rebuild_objects:
+            self.schedule_game_object_creation(rebuild_objects)
+
+        if changed_objects or rebuild_objects:
+            self.schedule_syntax_write()
+            self.schedule_object_cache_write()
+
+    def invalidate_completions(self, name: str):
+        """
+        Observer of the game object store, drops the cached completions of a game object only if its keys changed
+        """
+        cached = self.completion_cache.get(name)
+        if cached is None:
+            return
+
+        if cached[0] != frozenset(self.game_objects[name].keys()):
+            self.completion_cache.pop(name, None)
+
+    def get_completion_items(
+        self, flag_name: str, completion_kind
+    ) -> List[sublime.CompletionItem]:
+        cached = self.completion_cache.get(flag_name)
+        if cached is not None:
+            return cached[1]
+
+        keys = frozenset(self.game_objects[flag_name].keys())
+        items = [
+            sublime.CompletionItem(
+                trigger=key,
+                completion_format=sublime.COMPLETION_FORMAT_TEXT,
+                kind=completion_kind,
+                details=" ",
+            )
+            for key in sorted(keys)
+        ]
+        self.completion_cache[flag_name] = (keys, items, {x.trigger: x for x in items})
+        return items
+
+    def create_completion_list(
+        self, flag_name: str, completion_kind: str, view: Optional[sublime.View] = None
+    ):
         if not getattr(self, flag_name, False):
             return None
 
-        completions = self.game_objects[flag_name].keys()
-        completions = sorted(completions)
+        if view is None:
+            view = sublime.active_window().active_view()
+
+        items = self.get_completion_items(flag_name, completion_kind)
+        if view is not None:
+            items = self.rank_completion_items(view, flag_name, items)
+
         return sublime.CompletionList(
-            [
-                sublime.CompletionItem(
-                    trigger=key,
-                    completion_format=sublime.COMPLETION_FORMAT_TEXT,
-                    kind=completion_kind,
-                    details=" ",
-                )
-                # Calling sorted() twice makes it so completions are ordered by
-                # 1. the number of times they appear in the current buffer
-                # 2. if they dont appear they show up alphabetically
-                for key in sorted(completions)
-            ],
+            items,
             flags=sublime.INHIBIT_EXPLICIT_COMPLETIONS
             | sublime.INHIBIT_WORD_COMPLETIONS,
         )
 
+    def rank_completion_items(
+        self,
+        view: sublime.View,
+        flag_name: str,
+        items: List[sublime.CompletionItem],
+    ) -> List[sublime.CompletionItem]:
+        """
+        Order completions by
+        1. the number of times they appear in the current buffer
+        2. the number of times they appear in all the open buffers
+        3. if they dont appear they show up alphabetically
+        The order is only worked out again after the buffer of view changes
+        """
+        version = (view.buffer_id(), view.change_count())
+        cached = self.ranked_completion_cache.get(flag_name)
+        if cached is not None and cached[0] == version and cached[1] is items:
+            return cached[2]
+
+        keys, _, items_by_key = self.completion_cache[flag_name]
+        buffer_counts = get_view_index(view).token_counts
+        used_keys = keys & workspace_token_counts.keys()
+        if used_keys:
+            ranked_keys = sorted(
+                used_keys,
+                key=lambda x: (-buffer_counts[x], -workspace_token_counts[x], x),
+            )
+            ranked = [items_by_key[x] for x in ranked_keys] + [
+                x for x in items if x.trigger not in used_keys
+            ]
+        else:
+            ranked = items
+        self.ranked_completion_cache[flag_name] = (version, items, ranked)
+        return ranked
+
     def do_hover_async(self, view: sublime.View, point: int, hover_objects):
         word_region = view.word(point)
         word = view.substr(word_region)
@@ -319,9 +624,14 @@ class JominiEventListener(ABC):
             )
             return
 
-        # Iterate over the list and call show_popup_default for each game object
+        # Most words are not game objects so one lookup in the key index rules them out
+        found_objects = self.game_objects.get_objects_by_key(word)
+        if not found_objects:
+            return
+
+        # The first game object in hover_objects that has the word is shown
         for hover_object, name in hover_objects:
-            game_object = self.game_objects[hover_object].access(word)
+            game_object = found_objects.get(hover_object)
             if game_object:
                 self.show_popup_default(
                     view,
@@ -331,36 +641,36 @@ class JominiEventListener(ABC):
                 )
                 break
 
-    def check_for_patterns_and_set_flag(
-        self,
-        patterns_list: List[str],
-        flag_name: str,
-        view: sublime.View,
-        line: str,
-        point: int,
-    ):
-        for pattern in patterns_list:
-            r = re.search(rf'\b{pattern}\s?=\s?(")?', line)
-            if not r:
-                continue
-            y = 0
-            idx = line.index(pattern) + view.line(point).a + len(pattern) + 2
-            if r.groups()[0] == '"':
-                y = 2
-            if idx == point or idx + y == point or idx + 1 == point:
-                setattr(self, flag_name, True)
-                view.run_command("auto_complete")
-                return True
-        return False
-
-    def check_pattern_and_set_flag(
-        self, pattern: str, flag_name: str, view: sublime.View, line: str, point: int
-    ):
-        if pattern in line:
-            idx = line.index(pattern) + view.line(point).a + len(pattern)
-            if idx == point:
-                setattr(self, flag_name, True)
-                view.run_command("auto_complete")
+    def debounce(self, view: sublime.View, key: str, callback: Callable):
+        """
+        Run callback after the view has been idle for the CursorAnalysisDelay setting (in ms)
+        Calls with the same view and key are coalesced so only the latest one runs
+        """
+        delay = self.settings.get("CursorAnalysisDelay", 50)
+        self.debouncer.call(view, key, callback, delay)  # type: ignore
+
+    def schedule_cursor_analysis(self, view: sublime.View):
+        """
+        Debounced version of analyze_cursor, meant to be called from on_selection_modified_async
+        """
+        self.debounce(view, "cursor_analysis", lambda: self.analyze_cursor(view))
+
+    def analyze_cursor(self, view: sublime.View):
+        """
+        Run scope matching and completion detection for the current cursor position
+        """
+        if len(view.sel()) != 1:
+            return
+
+        change_count = view.change_count()
+        point = view.sel()[0].a
+        self.simple_scope_match(view)  # type: ignore
+        if self.debouncer.is_stale(view, change_count):
+            return
+        self.check_for_simple_completions(view, point)
+        if self.debouncer.is_stale(view, change_count):
+            return
+        self.check_for_complex_completions(view, point)  # type: ignore
 
     def check_for_simple_completions(self, view: sublime.View, point: int):
         """
@@ -373,11 +683,18 @@ class JominiEventListener(ABC):
         if view.substr(point) == "=":
             return
 
-        line = view.substr(view.line(point))
+        line_region = view.line(point)
+        line = view.substr(line_region)
+        column = point - line_region.a
 
-        for patterns, flag in self.game_data.simple_completion_pattern_flag_pairs: # type: ignore
-            if self.check_for_patterns_and_set_flag(patterns, flag, view, line, point):
-                return
+        flag = self.simple_completion_matcher.match(line, column)
+        if flag:
+            setattr(self, flag, True)
+            view.run_command("auto_complete")
+            return
 
-        for pattern, flag in self.game_data.simple_completion_scope_pattern_flag_pairs: # type: ignore
-            self.check_pattern_and_set_flag(pattern, flag, view, line, point)
+        flags = self.simple_completion_matcher.match_scope(line, column)
+        for flag in flags:
+            setattr(self, flag, True)
+        if flags:
+            view.run_command("auto_complete")
@@ -111,6 +111,21 @@ class JominiGameData(ABC):
         """
         pass
 
+    @property
+    def auto_complete_key_path_flag_pairs(self) -> List[Tuple[Any, ...]]:
+        """
+        Key path to game object mapping for autocomplete in more complicated situations
+
+        The key path is a tuple of the keys of the blocks around the cursor from the outermost to the innermost,
+        it matches if it is the end of the keys of the blocks around the cursor or of any of their parent blocks.
+        An optional third item is the key of the statement that the cursor is the value of:
+
+        (("opinion",), "opinion", "modifier")
+
+        When this is not empty it is used instead of auto_complete_selector_flag_pairs.
+        """
+        return []
+
     @property
     @abstractmethod
     def auto_complete_fields(self) -> Dict[str, List[Any]]:
@@ -1,7 +1,8 @@
 import os
-from typing import Set, Dict
+import threading
+from typing import Callable, Dict, List, Set
 
-from .jomini import GameObjectBase
+from .jomini import GameObjectBase, PdxScriptObject
 
 
 class GameObjectData:
@@ -11,6 +12,72 @@ class GameObjectData:
         self.path = path
 
 
+class JominiGameObjectStore(dict):
+    """
+    Dictionary of game object names to game objects that tells its observers whenever a game object changes.
+    Anything derived from game objects (completions, indexes, etc...) should be invalidated from an observer.
+    The store also keeps a reverse index of object keys to the game objects that define them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.observers: List[Callable[[str], None]] = list()
+        # Object key -> game object name -> the first object with that key
+        self.key_index: Dict[str, Dict[str, PdxScriptObject]] = dict()
+        # Game object name -> keys it has in key_index
+        self.indexed_keys: Dict[str, List[str]] = dict()
+        # Game objects are set from several loader threads at once
+        self.index_lock = threading.Lock()
+        for name in self:
+            self.index_keys(name)
+
+    def add_observer(self, callback: Callable[[str], None]):
+        self.observers.append(callback)
+
+    def __setitem__(self, name: str, game_object: GameObjectBase):
+        super().__setitem__(name, game_object)
+        self.notify(name)
+
+    def update(self, game_objects: Dict[str, GameObjectBase]):  # type: ignore
+        for name, game_object in game_objects.items():
+            self[name] = game_object
+
+    def notify(self, name: str):
+        """
+        Call all the observers for name
+        Must be called manually when a game object is changed in place instead of replaced
+        """
+        self.index_keys(name)
+        for callback in self.observers:
+            callback(name)
+
+    def index_keys(self, name: str):
+        with self.index_lock:
+            for key in self.indexed_keys.pop(name, []):
+                objects = self.key_index.get(key)
+                if objects is None:
+                    continue
+                objects.pop(name, None)
+                if not objects:
+                    self.key_index.pop(key, None)
+
+            keys = list()
+            for obj in self[name].main.objects:
+                objects = self.key_index.setdefault(obj.key, dict())
+                # Keep the first object like access() does
+                if name not in objects:
+                    objects[name] = obj
+                    keys.append(obj.key)
+            self.indexed_keys[name] = keys
+
+    def get_objects_by_key(self, key: str) -> Dict[str, PdxScriptObject]:
+        """
+        Return a dictionary of game object name -> object for every game object that has key
+        """
+        with self.index_lock:
+            return dict(self.key_index.get(key, {}))
+
+
 class JominiGameObjectManager:
     def __init__(self):
         self.example = GameObjectData("ambition", str, f"common{os.sep}ambitions")
@@ -26,11 +93,11 @@ class JominiGameObjectManager:
         return objects
 
     def get_default_game_objects(self):
-        base_object = GameObjectBase()
         objects = self.get_objects()
         game_objects = dict()
         for i in objects:
-            game_objects[i.name] = base_object
+            # Each object needs its own instance so updating one doesn't change the others
+            game_objects[i.name] = GameObjectBase()
 
         return game_objects
 
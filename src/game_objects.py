@@ -6,7 +6,7 @@ import ast
 import hashlib
 import json
 import os
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, Iterable, List, Set, Tuple
 
 import sublime
 from .jomini import dict_to_game_object
@@ -22,6 +22,9 @@ class JominiGameObject:
     def get_object_cache_path(self) -> str:
         return os.path.join(sublime.cache_path(), self.plugin_name, "object_cache.json")
 
+    def get_syntax_cache_path(self) -> str:
+        return os.path.join(sublime.cache_path(), self.plugin_name, "syntax_cache.json")
+
     def check_mod_for_changes(
         self,
         mod_files: List[Any],
@@ -111,9 +114,10 @@ class JominiGameObject:
             data = json.load(f)
         return data
 
-    def get_objects_from_cache(self, default_game_objects):
-        with open(self.get_object_cache_path(), "r") as f:
-            data = json.load(f)
+    def get_objects_from_cache(self, default_game_objects, data=None):
+        # data can be passed in if the object cache was already loaded
+        if data is None:
+            data = self.load_game_objects_json()
         for i in default_game_objects:
             if i in data:
                 default_game_objects[i] = dict_to_game_object(ast.literal_eval(data[i]))
@@ -128,6 +132,27 @@ class JominiGameObject:
         with open(self.get_object_cache_path(), "w") as f:
             f.write(json.dumps(objects))
 
+    def load_syntax_hashes(self) -> Dict[str, str]:
+        if not os.path.exists(self.get_syntax_cache_path()):
+            return dict()
+        with open(self.get_syntax_cache_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_syntax_hashes(self, game_objects) -> Dict[str, str]:
+        return {i: get_key_set_hash(game_objects[i].keys()) for i in game_objects}
+
+    def get_changed_syntax_objects(self, game_objects) -> Set[str]:
+        """
+        Return the names of the game objects whose set of keys changed since the syntax was last written
+        """
+        old_hashes = self.load_syntax_hashes()
+        new_hashes = self.get_syntax_hashes(game_objects)
+        return {i for i in new_hashes if old_hashes.get(i) != new_hashes[i]}
+
+    def save_syntax_hashes(self, game_objects):
+        with open(self.get_syntax_cache_path(), "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.get_syntax_hashes(game_objects)))
+
     def add_color_scheme_scopes(self):
         # Add scopes for yml text formatting to color scheme
         DEFAULT_CS = "Packages/Color Scheme - Default/Monokai.sublime-color-scheme"
@@ -146,21 +171,120 @@ class JominiGameObject:
                 f.write(rules)
 
 
+# Syntax regexes are split into several rules once they get longer than this
+MAX_SYNTAX_REGEX_LENGTH = 1500
+
+# Generated syntax sections, (header, scope) -> (key set hash, section text)
+syntax_section_cache: Dict[Tuple[str, str], Tuple[str, str]] = dict()
+
+
+def get_key_set_hash(keys: Iterable[str]) -> str:
+    return hashlib.sha256("\n".join(sorted(set(keys))).encode()).hexdigest()
+
+
+def write_syntax_file(path: str, text: str) -> bool:
+    """
+    Write text to the syntax file at path, the write is skipped if the file already has exactly the same text.
+    Every write makes sublime recompile the syntax and re-highlight all open views so it should be avoided when possible.
+    Return True if the file was written.
+    """
+    data = text.encode("utf-8")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
 def write_syntax(li: List[str], header: str, scope: str):
-    string = ""
-    count = 0
-    string += f"\n    # Generated {header}\n    - match: \\b("
+    """
+    Create the sublime-syntax rules that match every key in li with scope
+
+    Keys are put into a trie and written as prefix factored regexes, so instead of
+    \\b(add_gold|add_prestige|add_trait)\\b the rule is \\b(add_(?:gold|prestige|trait))\\b.
+    The regex engine then only has to check each prefix once instead of once per key.
+    Keys that aren't plain words can't be factored and are written as flat alternations.
+    Sections are cached by header and scope, so a section is only regenerated when its keys change.
+    """
+    key_set_hash = get_key_set_hash(li)
+    cached_section = syntax_section_cache.get((header, scope))
+    if cached_section is not None and cached_section[0] == key_set_hash:
+        return cached_section[1]
+
+    word_keys = set()
+    other_keys = list()
     for i in li:
-        count += 1
-        # Count is needed to split because columns are waaay too long for syntax regex
-        if count == 0:
-            string = f")\\b\n      scope: {scope}\n"
-            string += f"    # Generated {header}\n    - match: \\b({i}|"
-        elif count == 75:
-            string += f")\\b\n      scope: {scope}\n"
-            string += f"    # Generated {header}\n    - match: \\b({i}|"
-            count = 1
+        if is_word_key(i):
+            word_keys.add(i)
         else:
-            string += f"{i}|"
-    string += f")\\b\n      scope: {scope}"
-    return string
+            other_keys.append(i)
+
+    rules = get_factored_regexes(sorted(word_keys))
+    # Count is needed to split because columns are waaay too long for syntax regex
+    for i in range(0, len(other_keys), 75):
+        rules.append("|".join(other_keys[i : i + 75]))
+
+    section = "".join(
+        f"\n    # Generated {header}\n    - match: \\b({rule})\\b\n      scope: {scope}"
+        for rule in rules
+    )
+    syntax_section_cache[(header, scope)] = (key_set_hash, section)
+    return section
+
+
+def is_word_key(key: str) -> bool:
+    return bool(key) and all(x.isascii() and (x.isalnum() or x == "_") for x in key)
+
+
+def get_factored_regexes(keys: List[str], depth=0) -> List[str]:
+    """
+    Return a list of prefix factored regexes that together match exactly the strings in keys
+    If the regex for keys is too long, keys are split into groups by their first depth + 1 characters
+    """
+    if not keys:
+        return []
+
+    regex = trie_to_regex(make_trie(keys))
+    if len(regex) <= MAX_SYNTAX_REGEX_LENGTH or all(len(x) <= depth for x in keys):
+        return [regex]
+
+    groups: Dict[str, List[str]] = dict()
+    for key in keys:
+        groups.setdefault(key[: depth + 1], []).append(key)
+
+    regexes = list()
+    for prefix in sorted(groups):
+        regexes.extend(get_factored_regexes(groups[prefix], depth + 1))
+    return regexes
+
+
+def make_trie(keys: List[str]) -> Dict[str, Any]:
+    # An empty string key marks the end of a word
+    trie: Dict[str, Any] = dict()
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, dict())
+        node[""] = True
+    return trie
+
+
+def trie_to_regex(node: Dict[str, Any]) -> str:
+    is_end = "" in node
+    branches = [char + trie_to_regex(node[char]) for char in sorted(node) if char]
+    if not branches:
+        return ""
+
+    if all(len(x) == 1 for x in branches):
+        # Only single characters left, so a character class can be used
+        regex = branches[0] if len(branches) == 1 else f"[{''.join(branches)}]"
+        return f"{regex}?" if is_end else regex
+
+    if len(branches) == 1 and not is_end:
+        return branches[0]
+
+    regex = f"(?:{'|'.join(branches)})"
+    return f"{regex}?" if is_end else regex
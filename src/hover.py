@@ -4,19 +4,75 @@ Shows documentation for effects/triggers/scopes from the game logs in pop ups.
 Also shows goto definition popups for all game objects as well as saved scopes and variables.
 """
 
-import re
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import sublime
 
-from .css import CSS
+from .css import make_popup
+from .declaration_index import declaration_keys
 from .jomini_objects import PdxColorObject
 from .jomini import PdxScriptObject
-from .utils import IterViews, get_file_name, get_syntax_name
+from .reference_index import GuiReferenceIndex, ReferencesPanel, get_gui_tokens
+from .utils import IterViews, get_file_name, get_syntax_name, normalize_path
+from .view_index import get_view_index
 from .game_data import JominiGameData
 
+docs_popup_template = '<body id="jomini-body"><style>%s</style><p>%s</p></body>'
+docs_popup_base_style = (
+    "body { font-family: system;%s } p { font-size: 1.0rem; margin: 0; }"
+)
+docs_popup_bordered_style = (
+    " margin: 0; padding: 0.35rem; border: %s solid %s; background-color: %s;"
+)
+
+
+def make_docs_popup_style(border_width: str, border_color: str, background: str):
+    return docs_popup_base_style % (
+        docs_popup_bordered_style % (border_width, border_color, background)
+    )
+
+
+# DocsPopupStyle setting -> style of the documentation popups
+docs_popup_styles = {
+    "dark": make_docs_popup_style("0.2rem", "rgb(46, 46, 46)", "rgb(5, 5, 5)"),
+    "none": docs_popup_base_style % "",
+}
+# Scope -> style of the documentation popups when DocsPopupStyle is "dynamic"
+dynamic_docs_popup_styles = {
+    "keyword.effect": make_docs_popup_style(
+        "0.15rem", "rgb(128, 26, 0)", "rgb(10, 10, 10)"
+    ),
+    "string.trigger": make_docs_popup_style(
+        "0.15rem", "rgb(123, 123, 0)", "rgb(10, 10, 10)"
+    ),
+    "string.modifier.type": make_docs_popup_style(
+        "0.15rem", "rgb(123, 123, 0)", "rgb(10, 10, 10)"
+    ),
+    "storage.type.scope": make_docs_popup_style(
+        "0.15rem", "rgb(0, 122, 153)", "rgb(10, 10, 10)"
+    ),
+}
+texture_popup_content = """
+    <h1>Open Texture</h1>
+    <div></div>
+    <a href="%s" title="Open folder containing the texture.">Open Folder</a>
+    <br>
+    <a href="%s" title="Open %s in the default program">Open in default program</a>
+    <br>
+    <a href="%s" title="Open %s in sublime">Open in sublime</a>
+    <br>
+    <a href="%s" title="Show %s at current selection">Show Inline</a>
+"""
+
 
 class Hover:
+    gui_reference_index: Optional[GuiReferenceIndex] = None
+    # Number of references shown on each page of a popup
+    popup_reference_limit = 10
+    # (key, references) and (html before the references, body id) of the last popup with references
+    popup_references: Tuple[str, List[str]] = ("", [])
+    popup_prefix: Tuple[str, str] = ("", "jomini-body")
+
     def init_hover(
         self,
         script_syntax_name: str,
@@ -34,85 +90,14 @@ class Hover:
         settings: sublime.Settings,
     ):
         style = settings.get("DocsPopupStyle")
-        if style == "dark":
-            style = """
-                        body {
-                            font-family: system;
-                            margin: 0;
-                            padding: 0.35rem;
-                            border: 0.2rem solid rgb(46, 46, 46);
-                            background-color: rgb(5, 5, 5);
-                        }
-                        p {
-                            font-size: 1.0rem;
-                            margin: 0;
-                        }
-                    """
-        elif style == "none":
-            style = """
-                        body {
-                            font-family: system;
-                        }
-                        p {
-                            font-size: 1.0rem;
-                            margin: 0;
-                        }
-                    """
-        elif style == "dynamic":
-            if scope == "keyword.effect":
-                style = """
-                            body {
-                                font-family: system;
-                                margin: 0;
-                                padding: 0.35rem;
-                                border: 0.15rem solid rgb(128, 26, 0);
-                                background-color: rgb(10, 10, 10);
-                            }
-                            p {
-                                font-size: 1.0rem;
-                                margin: 0;
-                            }
-                        """
-            elif scope == "string.trigger" or scope == "string.modifier.type":
-                style = """
-                            body {
-                                font-family: system;
-                                margin: 0;
-                                padding: 0.35rem;
-                                border: 0.15rem solid rgb(123, 123, 0);
-                                background-color: rgb(10, 10, 10);
-                            }
-                            p {
-                                font-size: 1.0rem;
-                                margin: 0;
-                            }
-                        """
-            elif scope == "storage.type.scope":
-                style = """
-                            body {
-                                font-family: system;
-                                margin: 0;
-                                padding: 0.35rem;
-                                border: 0.15rem solid rgb(0, 122, 153);
-                                background-color: rgb(10, 10, 10);
-                            }
-                            p {
-                                font-size: 1.0rem;
-                                margin: 0;
-                            }
-                        """
+        if style == "dynamic":
+            style = dynamic_docs_popup_styles.get(scope, style)
+        else:
+            style = docs_popup_styles.get(style, style)
         item = view.substr(view.word(point))
         if item in collection:
             desc = collection[item]
-            hover_body = """
-                <body id="jomini-body">
-                    <style>%s</style>
-                    <p>%s</p>
-                </body>
-            """ % (
-                style,
-                desc,
-            )
+            hover_body = docs_popup_template % (style, desc)
 
             view.show_popup(
                 hover_body,
@@ -200,17 +185,7 @@ class Hover:
             type_example_text = '<p class="code-header">Example type definition:</p>'
             example = type_example_text + example
 
-        hoverBody = """
-            <body id="vic-body">
-                <style>%s</style>
-                <p class=\"codedesc\">%s</p>
-                %s
-            </body>
-        """ % (
-            CSS().default,
-            desc,
-            example,
-        )
+        hoverBody = make_popup(f'<p class="codedesc">{desc}</p>{example}', "vic-body")
 
         view.show_popup(
             hoverBody,
@@ -223,6 +198,32 @@ class Hover:
             max_width=1024,
         )
 
+    def get_gui_references(self, key: str) -> Dict[str, List[int]]:
+        """
+        Return a dictionary of path -> line numbers of the gui files that reference key
+        Open gui views are indexed from their current text, other gui files come from the on disk gui reference index
+        """
+        references: Dict[str, List[int]] = dict()
+        open_paths = set()
+        for i in IterViews(sublime.windows()):
+            path = i.file_name()
+            if not path or not path.endswith(".gui"):
+                continue
+            open_paths.add(normalize_path(path))
+            index = get_view_index(i)
+            tokens = index.memoize(
+                i, "gui_references", lambda: get_gui_tokens("\n".join(index.lines))
+            )
+            if key in tokens:
+                references[path] = tokens[key]
+
+        if self.gui_reference_index is not None:
+            for path, lines in self.gui_reference_index.get_lines(key).items():
+                if normalize_path(path) not in open_paths:
+                    references[path] = lines
+
+        return references
+
     def show_gui_popup(
         self, view: sublime.View, point: int, PdxObject: PdxScriptObject, header: str
     ):
@@ -256,76 +257,28 @@ class Hover:
             )
 
         references = []
-        ref = ""
-        for i in IterViews(sublime.windows()):
-            if not get_file_name(i).endswith(".gui"):
-                continue
+        definition_path = normalize_path(PdxObject.path)
+        for path, lines in self.get_gui_references(PdxObject.key).items():
+            filename = path.replace("\\", "/").rstrip("/").rpartition("/")[2]
+            for line_num in lines:
+                if word_line_num == line_num and word_file == filename:
+                    # Don't do current word
+                    continue
+                elif (
+                    line_num == PdxObject.line
+                    and normalize_path(path) == definition_path
+                ):
+                    # Don't do definition
+                    continue
+                references.append(f"{path}|{line_num}")
 
-            view_region = sublime.Region(0, i.size())
-            view_str = i.substr(view_region)
-            for j, line in enumerate(view_str.splitlines()):
-                definition_found = False
-                if PdxObject.key in line:
-                    filename = (
-                        get_file_name(view)
-                        .replace("\\", "/")
-                        .rstrip("/")
-                        .rpartition("/")[2]
-                    )
-                    line_num = j + 1
-                    if word_line_num == line_num and word_file == filename:
-                        # Don't do current word
-                        continue
-                    elif line_num == PdxObject.line and i.file_name() == PdxObject.path:
-                        # Don't do definition
-                        continue
-                    if not definition_found:
-                        references.append(f"{i.file_name()}|{line_num}")
-
-        if references:
-            ref = f'<p><b>References to&nbsp;&nbsp;</b><tt class="variable">{PdxObject.key}</tt></p>'
-            for j, i in enumerate(references):
-                if j > 10:
-                    break
-                fname = i.split("|")[0]
-                shortname = fname.replace("\\", "/").rstrip("/").rpartition("/")[2]
-                line = i.split("|")[1]
-                goto_args = {"path": fname, "line": line}
-                goto_url = sublime.command_url(
-                    "goto_script_object_definition", goto_args
-                )
-                ref += (
-                    """<a href="%s" title="Open %s and goto line %s">%s:%s</a>&nbsp;"""
-                    % (
-                        goto_url,
-                        shortname,
-                        line,
-                        shortname,
-                        line,
-                    )
-                )
-                goto_right_args = {"path": fname, "line": line}
-                goto_right_url = sublime.command_url(
-                    "goto_script_object_definition_right", goto_right_args
-                )
-                ref += (
-                    """<a class="icon" href="%s"title="Open Tab to Right of Current Selection">◨</a>&nbsp;<br>"""
-                    % (goto_right_url)
-                )
+        self.popup_references = (PdxObject.key, references)
+        ref = self.get_references_html(PdxObject.key, references)
 
         link = definition + ref
         if link:
-            hoverBody = """
-                <body id="vic-body">
-                    <style>%s</style>
-                    <h1>%s</h1>
-                    %s
-                </body>
-            """ % (
-                CSS().default,
-                header,
-                link,
-            )
+            self.popup_prefix = (f"<h1>{header}</h1>{definition}", "vic-body")
+            hoverBody = make_popup(f"<h1>{header}</h1>{link}", "vic-body")
 
             view.show_popup(
                 hoverBody,
@@ -336,6 +289,7 @@ class Hover:
                 ),
                 location=point,
                 max_width=1024,
+                on_navigate=lambda href: self.navigate_reference_popup(view, href),
             )
 
     def show_popup_default(
@@ -348,21 +302,11 @@ class Hover:
         if view.file_name() is None:
             return
 
-        link = self.get_definitions_for_popup(
-            view, point, PdxObject, header
-        ) + self.get_references_for_popup(view, point, PdxObject)
+        definition = self.get_definitions_for_popup(view, point, PdxObject, header)
+        link = definition + self.get_references_for_popup(view, point, PdxObject)
         if link:
-            hover_body = """
-                <body id="jomini-body">
-                    <style>%s</style>
-                    <h1>%s</h1>
-                    %s
-                </body>
-            """ % (
-                CSS().default,
-                header,
-                link,
-            )
+            self.popup_prefix = (f"<h1>{header}</h1>{definition}", "jomini-body")
+            hover_body = make_popup(f"<h1>{header}</h1>{link}")
 
             view.show_popup(
                 hover_body,
@@ -373,6 +317,71 @@ class Hover:
                 ),
                 location=point,
                 max_width=1024,
+                on_navigate=lambda href: self.navigate_reference_popup(view, href),
+            )
+
+    def get_references_html(self, key: str, references: List[str], page=0) -> str:
+        """
+        Return the links for one page of references, with "more…" and "open in panel" links if they don't all fit
+        Only the links of the requested page are built so later pages cost nothing until they are shown
+        """
+        if not references:
+            return ""
+
+        limit = max(1, self.popup_reference_limit)
+        start = page * limit
+        ref = f'<p><b>References to&nbsp;&nbsp;</b><tt class="variable">{key}</tt>&nbsp;&nbsp;({len(references)})</p>'
+        for i in references[start : start + limit]:
+            fname = i.split("|")[0]
+            shortname = fname.replace("\\", "/").rstrip("/").rpartition("/")[2]
+            line = i.split("|")[1]
+            goto_args = {"path": fname, "line": line}
+            goto_url = sublime.command_url("goto_script_object_definition", goto_args)
+            ref += (
+                """<a href="%s" title="Open %s and goto line %s">%s:%s</a>&nbsp;"""
+                % (
+                    goto_url,
+                    shortname,
+                    line,
+                    shortname,
+                    line,
+                )
+            )
+            goto_right_args = {"path": fname, "line": line}
+            goto_right_url = sublime.command_url(
+                "goto_script_object_definition_right", goto_right_args
+            )
+            ref += (
+                """<a class="icon" href="%s"title="Open Tab to Right of Current Selection">◨</a>&nbsp;<br>"""
+                % (goto_right_url)
+            )
+
+        if len(references) > limit:
+            if start + limit < len(references):
+                ref += f'<a href="references_page:{page + 1}">more…</a>&nbsp;&nbsp;'
+            ref += '<a href="references_panel">open in panel</a>'
+        return ref
+
+    def navigate_reference_popup(self, view: sublime.View, href: str):
+        if href.startswith("subl:"):
+            # Sublime runs command links itself even when a popup has an on_navigate callback
+            return
+        key, references = self.popup_references
+        if href.startswith("references_page:"):
+            page = int(href.partition(":")[2])
+            prefix, body_id = self.popup_prefix
+            view.update_popup(
+                make_popup(
+                    prefix + self.get_references_html(key, references, page), body_id
+                )
+            )
+        elif href == "references_panel":
+            window = view.window()
+            if window is None:
+                return
+            view.hide_popup()
+            ReferencesPanel(window).show(
+                key, [(x.split("|")[0], int(x.split("|")[1])) for x in references]
             )
 
     def handle_scripted_args(
@@ -398,6 +407,32 @@ class Hover:
 
         return view.substr(word).strip()
 
+    def get_declarations(self, view: sublime.View) -> Dict[str, List[sublime.Region]]:
+        """
+        Return a dictionary of saved variable and scope names to the regions they are declared at in view
+        The declarations are found in the parse tree of the view once per change of the buffer instead of on every popup
+        """
+        index = get_view_index(view)
+
+        def resolve():
+            declarations: Dict[str, List[sublime.Region]] = dict()
+            with index.lock:
+                for node in index.get_tree().iter_nodes():
+                    if node.key not in declaration_keys:
+                        continue
+                    if node.is_block:
+                        # save_scope_value_as = { name = x value = y }
+                        node = node.get_child("name")
+                    if node is None or node.value_start is None:
+                        continue
+                    # Scripted arguments like $NAME$ are part of the value token
+                    start = view.text_point(*node.value_start)
+                    region = sublime.Region(start, start + len(node.value))  # type: ignore
+                    declarations.setdefault(node.value, []).append(region)  # type: ignore
+            return declarations
+
+        return index.memoize(view, "declarations", resolve)
+
     def get_definitions_for_popup(
         self,
         view: sublime.View,
@@ -414,20 +449,7 @@ class Hover:
                 if get_syntax_name(i) != self.script_syntax_name:
                     continue
 
-                variables = [
-                    self.handle_scripted_args(i, x.a, True)
-                    for x in i.find_by_selector("entity.name.function.var.declaration")
-                    if self.handle_scripted_args(i, x.a) == PdxObject.key
-                ]
-                variables.extend(
-                    [
-                        self.handle_scripted_args(i, x.a, True)
-                        for x in i.find_by_selector(
-                            "entity.name.function.scope.declaration"
-                        )
-                        if self.handle_scripted_args(i, x.a) == PdxObject.key
-                    ]
-                )
+                variables = self.get_declarations(i).get(PdxObject.key, [])
                 for r in variables:
                     line = i.rowcol(r.a)[0] + 1  # type: ignore
                     path = get_file_name(i)
@@ -511,7 +533,6 @@ class Hover:
             return ""
         word_file = filename.replace("\\", "/").rstrip("/").rpartition("/")[2]
         references = []
-        ref = ""
         for i in IterViews(sublime.windows()):
             syntax_name = get_syntax_name(i)
             if (
@@ -519,55 +540,22 @@ class Hover:
                 and syntax_name != self.localization_syntax_name
             ):
                 continue
-            view_region = sublime.Region(0, i.size())
-            view_str = i.substr(view_region)
-            for j, line in enumerate(view_str.splitlines()):
-                if re.search(r"\b" + re.escape(PdxObject.key) + r"\b", line):
-                    filename = i.file_name()
-                    if filename is None:
-                        continue
-                    filename = (
-                        filename.replace("\\", "/").rstrip("/").rpartition("/")[2]
-                    )
-                    line_num = j + 1
-                    if word_line_num == line_num and word_file == filename:
-                        # Don't do current word
-                        continue
-                    elif line_num == PdxObject.line and i.file_name() == PdxObject.path:
-                        # Don't do definition
-                        continue
-                    else:
-                        references.append(f"{i.file_name()}|{line_num}")
-        if references:
-            ref = f'<p><b>References to&nbsp;&nbsp;</b><tt class="variable">{PdxObject.key}</tt></p>'
-            for i in references:
-                fname = i.split("|")[0]
-                shortname = fname.replace("\\", "/").rstrip("/").rpartition("/")[2]
-                line = i.split("|")[1]
-                goto_args = {"path": fname, "line": line}
-                goto_url = sublime.command_url(
-                    "goto_script_object_definition", goto_args
-                )
-                ref += (
-                    """<a href="%s" title="Open %s and goto line %s">%s:%s</a>&nbsp;"""
-                    % (
-                        goto_url,
-                        shortname,
-                        line,
-                        shortname,
-                        line,
-                    )
-                )
-                goto_right_args = {"path": fname, "line": line}
-                goto_right_url = sublime.command_url(
-                    "goto_script_object_definition_right", goto_right_args
-                )
-                ref += (
-                    """<a class="icon" href="%s"title="Open Tab to Right of Current Selection">◨</a>&nbsp;<br>"""
-                    % (goto_right_url)
-                )
-
-        return ref
+            filename = i.file_name()
+            if filename is None:
+                continue
+            filename = filename.replace("\\", "/").rstrip("/").rpartition("/")[2]
+            for j in get_view_index(i).find_lines(PdxObject.key):
+                line_num = j + 1
+                if word_line_num == line_num and word_file == filename:
+                    # Don't do current word
+                    continue
+                elif line_num == PdxObject.line and i.file_name() == PdxObject.path:
+                    # Don't do definition
+                    continue
+                else:
+                    references.append(f"{i.file_name()}|{line_num}")
+        self.popup_references = (PdxObject.key, references)
+        return self.get_references_html(PdxObject.key, references)
 
     def show_texture_hover_popup(
         self, view: sublime.View, point: int, texture_name: str, full_texture_path: str
@@ -583,28 +571,17 @@ class Hover:
             in_sublime_args,  # type: ignore
         )
         open_inline_url = sublime.command_url("open_jomini_texture ", inline_args)
-        hover_body = """
-            <body id=\"jomini-body\">
-                <style>%s</style>
-                <h1>Open Texture</h1>
-                <div></div>
-                <a href="%s" title="Open folder containing the texture.">Open Folder</a>
-                <br>
-                <a href="%s" title="Open %s in the default program">Open in default program</a>
-                <br>
-                <a href="%s" title="Open %s in sublime">Open in sublime</a>
-                <br>
-                <a href="%s" title="Show %s at current selection">Show Inline</a>
-            </body>
-        """ % (
-            CSS().default,
-            open_folder_url,
-            open_texture_url,
-            texture_name,
-            open_in_sublime_url,
-            texture_name,
-            open_inline_url,
-            texture_name,
+        hover_body = make_popup(
+            texture_popup_content
+            % (
+                open_folder_url,
+                open_texture_url,
+                texture_name,
+                open_in_sublime_url,
+                texture_name,
+                open_inline_url,
+                texture_name,
+            )
         )
 
         view.show_popup(
@@ -640,17 +617,7 @@ class Hover:
 
         link = self.get_definitions_for_popup(view, point, PdxObject, header, color)
         if link:
-            hover_body = """
-                <body id="jomini-body">
-                    <style>%s</style>
-                    <h1>%s</h1>
-                    %s
-                </body>
-            """ % (
-                CSS().default,
-                header,
-                link,
-            )
+            hover_body = make_popup(f"<h1>{header}</h1>{link}")
 
             view.show_popup(
                 hover_body,
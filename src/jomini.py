@@ -1,6 +1,7 @@
+import copy
 import os
 from json import dumps
-from typing import Any
+from typing import Any, Dict, Iterable, List
 
 """
     All of this code is not game specific, any Jomini based paradox game can use this to parse game files and create GameObjects.
@@ -40,16 +41,20 @@ from typing import Any
         • remove() - Remove a PdxScriptObject or string -> None
         • clear() - Remove all PdxScriptObjects from the list  -> None
         • add() - Add a new PdxScriptObject to the object -> None
+        • replace_file_objects(path, objects) - Replace all the PdxScriptObjects from a single file -> None
         • to_dict() - Return a dictionary of PdxScriptObjects -> dict
         • to_json() - Return a json formatted string of PdxScriptObjects -> str
 
     To implement custom parsing for a GameObject:
-        1. override the get_pdx_object_list() function
+        1. override the get_file_pdx_objects() function, or get_pdx_object_list() if the directory walk has to change as well
         2. Fill self.main with data in another way, all that should have to be changed is the should_read(line) part
         3. If more information than key, path, and line number are needed:
         4. implement a new PdxScriptObject class that has more attributes but keeps the same methods as PdxScriptObject
         5. Make sure self.main is filled with the new attributes when parsing
-        6. Change PdxScriptObject() to your new class name in get_pdx_object_list()
+        6. Change PdxScriptObject() to your new class name in get_file_pdx_objects(), or in get_pdx_object_list() if that is what was overridden
+
+    When a file is saved only that file is parsed again with get_file_pdx_objects(),
+    a GameObject that overrides get_pdx_object_list() but not get_file_pdx_objects() is created again from all of its files instead.
 """
 
 
@@ -101,6 +106,8 @@ class PdxScriptObjectType:
 
     def __init__(self, obj_list):
         self.objects = obj_list
+        # Key -> copy of the object that was overriden by an object with the same key from another file
+        self.shadowed: Dict[str, Any] = dict()
 
     def __iadd__(self, other):
         """
@@ -110,8 +117,11 @@ class PdxScriptObjectType:
         for j in other.objects:
             if j in self.objects:
                 # Replace the object in self.objects with the object in other.objects
-                self.objects[self.objects.index(j)].path = j.path
-                self.objects[self.objects.index(j)].line = j.line
+                old = self.objects[self.objects.index(j)]
+                if old.path != j.path:
+                    self.shadowed[j.key] = copy.copy(old)
+                old.path = j.path
+                old.line = j.line
             else:
                 # Append a new object if there are no conflicts
                 self.objects.append(j)
@@ -223,6 +233,57 @@ class GameObjectBase:
         for key in self.keys():
             self.main.objects.remove(key)
 
+    def replace_file_objects(self, path: str, objects: List[PdxScriptObject]) -> None:
+        """
+        Replace every PdxScriptObject that was found in the file at path with objects
+        Used to update a single file without parsing the whole game object again
+        Objects that the file overrode come back if the file no longer defines their key.
+        """
+        normalized_path = os.path.normcase(os.path.normpath(path))
+        filename = os.path.basename(normalized_path)
+        shadowed = self.main.shadowed
+
+        kept = list()
+        removed_keys = list()
+        # Path -> whether it is the file at path, objects share a few paths so each is only normalized once
+        in_file: Dict[str, bool] = dict()
+        for x in self.main.objects:
+            match = in_file.get(x.path)
+            if match is None:
+                match = os.path.normcase(os.path.normpath(x.path)) == normalized_path
+                in_file[x.path] = match
+            if match:
+                removed_keys.append(x.key)
+            else:
+                kept.append(x)
+
+        index = {x.key: i for i, x in enumerate(kept)}
+        new_keys = {x.key for x in objects}
+        for key in removed_keys:
+            if key in new_keys:
+                continue
+            old = shadowed.pop(key, None)
+            if old is None or key in index:
+                continue
+            # A file with the same name replaces the whole vanilla file, so its objects stay removed
+            if os.path.basename(os.path.normcase(old.path)) == filename:
+                continue
+            index[key] = len(kept)
+            kept.append(old)
+
+        for obj in objects:
+            i = index.get(obj.key)
+            if i is None:
+                index[obj.key] = len(kept)
+                kept.append(obj)
+            else:
+                if kept[i].path != obj.path:
+                    shadowed[obj.key] = kept[i]
+                kept[i] = obj
+
+        self.main.objects = kept
+        self.end = self.length() - 1
+
     def sort(self) -> None:
         """
         Sort PdxScriptObjects by key
@@ -344,20 +405,25 @@ class GameObjectBase:
                     continue
                 file_path = os.path.join(dirpath, filename)
                 with open(file_path, "r", encoding="utf-8-sig") as file:
-                    for i, line in enumerate(file):
-                        if self.should_read(line):
-                            found_item = (
-                                line.split("=")
-                                .pop(0)
-                                .replace(" ", "")
-                                .replace("\t", "")
-                            )
-                            if found_item:
-                                obj_list.append(
-                                    PdxScriptObject(found_item, file_path, i + 1)
-                                )
+                    obj_list.extend(self.get_file_pdx_objects(file_path, file))
         return PdxScriptObjectType(obj_list)
 
+    # Override this function for custom parsing of a single file
+    def get_file_pdx_objects(
+        self, file_path: str, lines: Iterable[str]
+    ) -> List[PdxScriptObject]:
+        """
+        Return the PdxScriptObjects defined in a single file
+        lines can be an open file or the lines of an unsaved buffer
+        """
+        obj_list = list()
+        for i, line in enumerate(lines):
+            if self.should_read(line):
+                found_item = line.split("=").pop(0).replace(" ", "").replace("\t", "")
+                if found_item:
+                    obj_list.append(PdxScriptObject(found_item, file_path, i + 1))
+        return obj_list
+
     def should_read(self, x: str) -> bool:
         # Check if a line should be read
         y = x.split("#")[0]
@@ -390,3 +456,27 @@ def dict_to_game_object(objects: dict) -> GameObjectBase:
     game_object = GameObjectBase()
     game_object.main = PdxScriptObjectType(obj_list)
     return game_object
+
+
+def parses_single_files(class_ref: type) -> bool:
+    """
+    Check if a GameObject class parses its files one at a time with get_file_pdx_objects
+    Classes that only override get_pdx_object_list parse their files some other way so they can't be updated one file at a time.
+    """
+    return (
+        class_ref.get_file_pdx_objects is not GameObjectBase.get_file_pdx_objects  # type: ignore
+        or class_ref.get_pdx_object_list is GameObjectBase.get_pdx_object_list  # type: ignore
+    )
+
+
+def create_file_parser(class_ref: type, *args) -> GameObjectBase:
+    """
+    Create an instance of a GameObject class that is only used to parse single files
+    get_data does nothing while the class is initialized so no game files are walked,
+    the instance still gets the level, ignored_files and included_files the class passes to GameObjectBase.
+    """
+    parser = class_ref.__new__(class_ref)
+    parser.get_data = lambda objpath: None
+    parser.__init__(*args)
+    del parser.get_data
+    return parser
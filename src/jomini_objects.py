@@ -7,7 +7,7 @@ NamedColor
 import os
 import re
 from colorsys import hsv_to_rgb
-from typing import Union
+from typing import Iterable, List, Union
 
 from .jomini import PdxScriptObject, PdxScriptObjectType, GameObjectBase
 
@@ -29,18 +29,21 @@ class GuiType(GameObjectBase):
                     if filename not in self.included_files:
                         continue
                 with open(file_path, "r", encoding="utf-8-sig") as file:
-                    for i, line in enumerate(file):
-                        if self.should_read(line):
-                            found_item = re.search(
-                                r"type\s([A-Za-z_][A-Za-z_0-9]*)\s?=", line
-                            )
-                            if found_item and found_item.groups()[0]:
-                                found_item = found_item.groups()[0]
-                                obj_list.append(
-                                    PdxScriptObject(found_item, file_path, i + 1)
-                                )
+                    obj_list.extend(self.get_file_pdx_objects(file_path, file))
         return PdxScriptObjectType(obj_list)
 
+    def get_file_pdx_objects(
+        self, file_path: str, lines: Iterable[str]
+    ) -> List[PdxScriptObject]:
+        obj_list = list()
+        for i, line in enumerate(lines):
+            if self.should_read(line):
+                found_item = re.search(r"type\s([A-Za-z_][A-Za-z_0-9]*)\s?=", line)
+                if found_item and found_item.groups()[0]:
+                    found_item = found_item.groups()[0]
+                    obj_list.append(PdxScriptObject(found_item, file_path, i + 1))
+        return obj_list
+
     def should_read(self, x: str) -> bool:
         # Check if a line should be read
         out = re.search(r"type\s[A-Za-z_][A-Za-z_0-9]*\s?=", x)
@@ -63,18 +66,21 @@ class GuiTemplate(GameObjectBase):
                     if filename not in self.included_files:
                         continue
                 with open(file_path, "r", encoding="utf-8-sig") as file:
-                    for i, line in enumerate(file):
-                        if self.should_read(line):
-                            found_item = re.search(
-                                r"template\s([A-Za-z_][A-Za-z_0-9]*)", line
-                            )
-                            if found_item and found_item.groups()[0]:
-                                found_item = found_item.groups()[0]
-                                obj_list.append(
-                                    PdxScriptObject(found_item, file_path, i + 1)
-                                )
+                    obj_list.extend(self.get_file_pdx_objects(file_path, file))
         return PdxScriptObjectType(obj_list)
 
+    def get_file_pdx_objects(
+        self, file_path: str, lines: Iterable[str]
+    ) -> List[PdxScriptObject]:
+        obj_list = list()
+        for i, line in enumerate(lines):
+            if self.should_read(line):
+                found_item = re.search(r"template\s([A-Za-z_][A-Za-z_0-9]*)", line)
+                if found_item and found_item.groups()[0]:
+                    found_item = found_item.groups()[0]
+                    obj_list.append(PdxScriptObject(found_item, file_path, i + 1))
+        return obj_list
+
     def should_read(self, x: str) -> bool:
         # Check if a line should be read
         out = re.search(r"template\s[A-Za-z_][A-Za-z_0-9]*", x)
@@ -239,28 +245,31 @@ class NamedColor(GameObjectBase):
                     if filename not in self.included_files:
                         continue
                 with open(file_path, "r", encoding="utf-8-sig") as file:
-                    for i, line in enumerate(file):
-                        if self.should_read(line):
-                            found_item = re.search(
-                                r"([A-Za-z_][A-Za-z_0-9]*)\s*=(.*)", line
-                            )
-                            if found_item and found_item.groups()[0]:
-                                item_color = found_item.groups()[1]
-                                found_item = found_item.groups()[0]
-                                item_color = item_color.strip().split("#")[0]
-                                item_color = item_color.rpartition("}")[0]
-                                if not item_color:
-                                    continue
-                                else:
-                                    item_color = item_color.replace("\t", " ") + " }"
-                                    item_color = re.sub(r"\s+", " ", item_color)
-                                    obj_list.append(
-                                        PdxColorObject(
-                                            found_item, file_path, i + 1, item_color
-                                        )
-                                    )
+                    obj_list.extend(self.get_file_pdx_objects(file_path, file))
         return PdxScriptObjectType(obj_list)
 
+    def get_file_pdx_objects(
+        self, file_path: str, lines: Iterable[str]
+    ) -> List[PdxScriptObject]:
+        obj_list = list()
+        for i, line in enumerate(lines):
+            if self.should_read(line):
+                found_item = re.search(r"([A-Za-z_][A-Za-z_0-9]*)\s*=(.*)", line)
+                if found_item and found_item.groups()[0]:
+                    item_color = found_item.groups()[1]
+                    found_item = found_item.groups()[0]
+                    item_color = item_color.strip().split("#")[0]
+                    item_color = item_color.rpartition("}")[0]
+                    if not item_color:
+                        continue
+                    else:
+                        item_color = item_color.replace("\t", " ") + " }"
+                        item_color = re.sub(r"\s+", " ", item_color)
+                        obj_list.append(
+                            PdxColorObject(found_item, file_path, i + 1, item_color)
+                        )
+        return obj_list
+
     def should_read(self, x: str) -> bool:
         # Check if a line should be read
         if re.search(r"([A-Za-z_][A-Za-z_0-9]*)\s*=", x):
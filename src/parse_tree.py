@@ -0,0 +1,316 @@
+"""
+Parse tree of Jomini script.
+The tree has every statement and block of a buffer with its key, operator, value, and position, it is built from the line tokens of script_tokens.
+ViewIndex keeps a tree for every indexed buffer, edits that don't add or remove braces only parse the contents of the block they were made in again.
+"""
+
+import bisect
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .script_tokens import (
+    CLOSE,
+    OPEN,
+    OPERATOR,
+    STRING,
+    WORD,
+    LineToken,
+    get_block_key,
+)
+
+Position = Tuple[int, int]
+# (row, column, kind, text)
+Token = Tuple[int, int, int, str]
+
+
+class Node:
+    """
+    A statement (key = value), a block (key = { ... }), or a plain value inside of a block
+    Positions are (row, column), end is the position right after the node and is None for blocks that are never closed
+    """
+
+    __slots__ = (
+        "key",
+        "operator",
+        "value",
+        "value_start",
+        "start",
+        "end",
+        "open",
+        "parent",
+        "children",
+        "child_starts",
+    )
+
+    def __init__(
+        self,
+        key: Optional[str],
+        operator: Optional[str],
+        value: Optional[str],
+        start: Position,
+        parent: Optional["Node"],
+    ):
+        self.key = key
+        self.operator = operator
+        self.value = value
+        self.value_start: Optional[Position] = None
+        self.start = start
+        self.end: Optional[Position] = None
+        # Position of the { of a block
+        self.open: Optional[Position] = None
+        self.parent = parent
+        self.children: List[Node] = list()
+        self.child_starts: List[Position] = list()
+
+    @property
+    def is_block(self) -> bool:
+        return self.open is not None
+
+    def add_child(self, node: "Node"):
+        self.children.append(node)
+        self.child_starts.append(node.start)
+
+    def get_child(self, key: str) -> Optional["Node"]:
+        for child in self.children:
+            if child.key == key:
+                return child
+        return None
+
+
+def iter_line_tokens(line_tokens: List[List[LineToken]]) -> Iterator[Token]:
+    for row, tokens in enumerate(line_tokens):
+        for col, kind, text in tokens:
+            yield row, col, kind, text
+
+
+def iter_block_tokens(
+    line_tokens: List[List[LineToken]], block: Node, is_root: bool
+) -> Iterator[Token]:
+    """
+    Yield the tokens inside of block, the blocks in it are skipped after their { so their contents can be kept
+    """
+    # { of a child block -> position of its }
+    child_closes = {
+        x.open: (x.end[0], x.end[1] - 1)
+        for x in block.children
+        if x.open is not None and x.end is not None
+    }
+    start = (0, -1) if is_root else block.open
+    end = None if is_root or block.end is None else (block.end[0], block.end[1] - 1)
+    row = start[0]  # type: ignore
+    index = 0
+    while row < len(line_tokens):
+        tokens = line_tokens[row]
+        while index < len(tokens):
+            col, kind, text = tokens[index]
+            index += 1
+            position = (row, col)
+            if position <= start:  # type: ignore
+                continue
+            if end is not None and position >= end:
+                return
+            yield row, col, kind, text
+            close = child_closes.get(position) if kind == OPEN else None
+            if close is not None:
+                row = close[0]
+                tokens = line_tokens[row]
+                index = [x[0] for x in tokens].index(close[1]) + 1
+        row += 1
+        index = 0
+
+
+class ParseTree:
+    def __init__(self, line_tokens: List[List[LineToken]]):
+        self.root = Node(None, None, None, (0, 0), None)
+        self.has_unclosed_blocks = not self.parse(
+            iter_line_tokens(line_tokens), self.root, dict()
+        )
+
+    def parse(
+        self, tokens: Iterable[Token], parent: Node, kept: Dict[Position, Node]
+    ) -> bool:
+        """
+        Add the statements and blocks in tokens to parent, return False if a block in them is never closed
+        Blocks whose { is in kept get the contents of the kept block instead, tokens must not have their contents or their }.
+        """
+        stack = [parent]
+        # Tokens of the statement being read
+        pending: List[Token] = list()
+        # Statement that the last token was the value of, a { right after it makes it a block (color = hsv { ... })
+        last_statement: Optional[Node] = None
+        # The last 3 tokens since the last brace, used for the keys of blocks
+        recent: List[LineToken] = list()
+
+        for row, col, kind, text in tokens:
+            current = stack[-1]
+            if kind == OPEN or kind == CLOSE:
+                key = get_block_key(recent)
+                recent = list()
+            else:
+                recent = recent[-2:] + [(col, kind, text)]
+
+            if kind == WORD or kind == STRING:
+                if len(pending) >= 2 and pending[-1][2] == OPERATOR:
+                    self.add_values(pending[:-2], current)
+                    key_row, key_col, _, key_text = pending[-2]
+                    node = Node(
+                        key_text, pending[-1][3], text, (key_row, key_col), current
+                    )
+                    node.value_start = (row, col)
+                    node.end = (row, col + len(text))
+                    current.add_child(node)
+                    pending = list()
+                    last_statement = node
+                else:
+                    pending.append((row, col, kind, text))
+                    last_statement = None
+            elif kind == OPERATOR:
+                if pending and pending[-1][2] != OPERATOR:
+                    pending.append((row, col, kind, text))
+                else:
+                    # An operator without a key starts over
+                    self.add_values(pending, current)
+                    pending = list()
+                last_statement = None
+            elif kind == OPEN:
+                if last_statement is not None:
+                    node = last_statement
+                elif len(pending) >= 2 and pending[-1][2] == OPERATOR:
+                    self.add_values(pending[:-2], current)
+                    start = (pending[-2][0], pending[-2][1])
+                    node = Node(None, pending[-1][3], None, start, current)
+                    current.add_child(node)
+                elif pending:
+                    # Blocks without an operator like template name { ... } are keyed by the last word
+                    self.add_values(pending[:-1], current)
+                    start = (pending[-1][0], pending[-1][1])
+                    node = Node(None, None, None, start, current)
+                    current.add_child(node)
+                else:
+                    node = Node(None, None, None, (row, col), current)
+                    current.add_child(node)
+                node.key = key
+                node.open = (row, col)
+                node.end = None
+                pending = list()
+                last_statement = None
+                old = kept.get((row, col))
+                if old is None:
+                    stack.append(node)
+                else:
+                    # The block is kept with its contents, only what is before its { can be different
+                    old.key = node.key
+                    old.operator = node.operator
+                    old.value = node.value
+                    old.value_start = node.value_start
+                    old.start = node.start
+                    old.parent = current
+                    current.children[-1] = old
+                    current.child_starts[-1] = old.start
+            elif kind == CLOSE:
+                self.add_values(pending, current)
+                pending = list()
+                last_statement = None
+                if len(stack) > 1:
+                    stack.pop().end = (row, col + 1)
+
+        self.add_values(pending, stack[-1])
+        return len(stack) == 1
+
+    def add_values(self, tokens: List[Token], parent: Node):
+        for row, col, kind, text in tokens:
+            if kind == OPERATOR:
+                continue
+            node = Node(None, None, text, (row, col), parent)
+            node.value_start = (row, col)
+            node.end = (row, col + len(text))
+            parent.add_child(node)
+
+    def reparse_block(self, line_tokens: List[List[LineToken]], block: Node):
+        """
+        Parse the contents of block again, the blocks inside of it are kept as they are
+        Only valid if no braces were added or removed and no block starts within a few tokens after the edit.
+        """
+        kept = {x.open: x for x in block.children if x.open is not None}
+        is_root = block is self.root
+        contents = Node(None, None, None, block.start, None)
+        self.parse(iter_block_tokens(line_tokens, block, is_root), contents, kept)
+        block.children = contents.children
+        block.child_starts = contents.child_starts
+        for child in block.children:
+            child.parent = block
+
+    def shift_rows(self, row: int, delta: int):
+        """
+        Move every position at or after row by delta rows, used when lines were added or removed before row
+        """
+        self.shift_node(self.root, row, delta)
+
+    def shift_node(self, node: Node, row: int, delta: int):
+        if node.start[0] >= row:
+            node.start = (node.start[0] + delta, node.start[1])
+        if node.value_start is not None and node.value_start[0] >= row:
+            node.value_start = (node.value_start[0] + delta, node.value_start[1])
+        if node.open is not None and node.open[0] >= row:
+            node.open = (node.open[0] + delta, node.open[1])
+        if node.end is not None and node.end[0] >= row:
+            node.end = (node.end[0] + delta, node.end[1])
+
+        # Children don't overlap, so only the last one that starts before row can end after it
+        i = max(bisect.bisect_left(node.child_starts, (row, -1)) - 1, 0)
+        for child in node.children[i:]:
+            self.shift_node(child, row, delta)
+        node.child_starts[i:] = [x.start for x in node.children[i:]]
+
+    def get_enclosing_blocks(self, row: int, col: int) -> List[Node]:
+        """
+        Return the blocks that contain row and col, innermost first
+        A block contains every position from its { up to and including the position right after its },
+        a block that is never closed contains nothing itself but the blocks inside of it still can.
+        """
+        position = (row, col)
+        enclosing: List[Node] = list()
+        # A block that was closed right before another one starts
+        closed_before = None
+        node = self.root
+        while True:
+            i = bisect.bisect_right(node.child_starts, position) - 1
+            if i < 0:
+                break
+            child = node.children[i]
+            if i > 0 and node.children[i - 1].open is not None:
+                if node.children[i - 1].end == position:
+                    closed_before = node.children[i - 1]
+            if child.open is None or child.open > position:
+                break
+            if child.end is not None:
+                if position > child.end:
+                    break
+                enclosing.insert(0, child)
+            node = child
+
+        if closed_before is not None:
+            enclosing.insert(0, closed_before)
+        return enclosing
+
+    def get_block_containing_row(self, row: int) -> Node:
+        """
+        Return the innermost block that contains all of row, row must not have any braces on it
+        """
+        enclosing = self.get_enclosing_blocks(row, 0)
+        return enclosing[0] if enclosing else self.root
+
+    def iter_nodes(self) -> Iterator[Node]:
+        """
+        Yield every node in the order they are in the buffer
+        """
+        stack = list(reversed(self.root.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def find_nodes(self, key: str) -> List[Node]:
+        """
+        Return every node with key in the order they are in the buffer
+        """
+        return [x for x in self.iter_nodes() if x.key == key]
@@ -0,0 +1,75 @@
+"""
+Opt-in profiler for the phases of plugin startup.
+Enabled with the "ProfileStartup" setting, the report is written to the plugin's cache directory.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+
+import sublime
+
+
+class StartupProfiler:
+    def __init__(self, plugin_name: str, enabled=False):
+        self.plugin_name = plugin_name
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        # (phase name, start offset, duration, thread name)
+        self.phases: List[Tuple[str, float, float, str]] = list()
+
+    def get_report_path(self) -> str:
+        return os.path.join(
+            sublime.cache_path(), self.plugin_name, "startup_profile.txt"
+        )
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phase_end = time.perf_counter()
+            self.phases.append(
+                (
+                    name,
+                    phase_start - self.start,
+                    phase_end - phase_start,
+                    threading.current_thread().name,
+                )
+            )
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """
+        Return a callable that runs func inside of a phase, used for work that is deferred with set_timeout_async
+        """
+
+        def run():
+            with self.phase(name):
+                return func()
+
+        return run
+
+    def write_report(self):
+        if not self.enabled:
+            return
+
+        lines = [f"{self.plugin_name} startup profile"]
+        lines.append(f"{'phase':<32}{'start (ms)':>12}{'time (ms)':>12}  thread")
+        for name, start, duration, thread_name in self.phases:
+            start_ms = start * 1000
+            duration_ms = duration * 1000
+            lines.append(
+                f"{name:<32}{start_ms:>12.1f}{duration_ms:>12.1f}  {thread_name}"
+            )
+        total = max((x[1] + x[2] for x in self.phases), default=0.0)
+        lines.append(f"{'total':<32}{'':>12}{total * 1000:>12.1f}")
+
+        with open(self.get_report_path(), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
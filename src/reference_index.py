@@ -0,0 +1,469 @@
+"""
+Project wide index of the identifiers in mod and vanilla script, gui, and localization files.
+The index maps every identifier to the files and lines it is on so finding all references to a key is a dictionary lookup.
+It is saved in the plugin's cache directory with the modification time of every indexed file,
+on startup only the files whose modification time changed are read again, using a pool of threads.
+GuiReferenceIndex is the same index for gui files that only holds the names of the types and templates they reference.
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import sublime
+
+from .utils import normalize_path
+from .view_index import word_re
+
+indexed_extensions = (".txt", ".gui", ".yml")
+REFERENCE_CACHE_VERSION = 4
+
+
+def strip_comment(line: str) -> str:
+    """
+    Remove the comment from the end of line, a # inside a quoted string is text formatting and not a comment
+    """
+    if '"' not in line:
+        return line.split("#", 1)[0]
+    in_string = False
+    for i, char in enumerate(line):
+        if char == '"':
+            in_string = not in_string
+        elif char == "#" and not in_string:
+            return line[:i]
+    return line
+
+
+def get_file_tokens(text: str) -> Dict[str, List[int]]:
+    """
+    Return a dictionary of identifier -> line numbers (starting at 1) for text, comments are ignored
+    """
+    tokens: Dict[str, List[int]] = dict()
+    for i, line in enumerate(text.split("\n"), 1):
+        line = strip_comment(line)
+        for token in set(word_re.findall(line)):
+            if not token.isdigit():
+                tokens.setdefault(token, []).append(i)
+    return tokens
+
+
+gui_reference_re = re.compile(
+    r"\busing\s*=\s*(\w+)"
+    r"|\btemplate\s+(\w+)"
+    r"|\btype\s+(\w+)\s*=\s*(\w+)?"
+    r"|^\s*(\w+)\s*=\s*\{"
+)
+
+
+def get_gui_tokens(text: str) -> Dict[str, List[int]]:
+    """
+    Return a dictionary of gui type or template name -> line numbers (starting at 1) for text
+    Only "using = X", "template X", "type X = Y" and "X = {" are references in gui files
+    """
+    tokens: Dict[str, List[int]] = dict()
+    for i, line in enumerate(text.split("\n"), 1):
+        line = strip_comment(line)
+        for match in gui_reference_re.finditer(line):
+            for token in set(x for x in match.groups() if x):
+                lines = tokens.setdefault(token, [])
+                if not lines or lines[-1] != i:
+                    lines.append(i)
+    return tokens
+
+
+class ReferenceIndex:
+    cache_name = "references_cache.json"
+    extensions: Tuple[str, ...] = indexed_extensions
+
+    def __init__(self, plugin_name: str):
+        self.plugin_name = plugin_name
+        # Normalized path -> (modification time, identifier -> line numbers)
+        self.files: Dict[str, Tuple[float, Dict[str, List[int]]]] = dict()
+        # Identifier -> normalized path -> line numbers
+        self.references: Dict[str, Dict[str, List[int]]] = dict()
+        # Normalized path -> the path as it was found, used for display and opening the file
+        self.display_paths: Dict[str, str] = dict()
+        self.roots: Tuple[str, ...] = tuple()
+        self.ready = False
+        self.building = False
+        self.save_pending = False
+        self.lock = threading.Lock()
+
+    def get_cache_path(self) -> str:
+        return os.path.join(sublime.cache_path(), self.plugin_name, self.cache_name)
+
+    def get_file_tokens(self, text: str) -> Dict[str, List[int]]:
+        return get_file_tokens(text)
+
+    def read_file_tokens(
+        self, path: str
+    ) -> Optional[Tuple[float, Dict[str, List[int]]]]:
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, "r", encoding="utf-8-sig", errors="replace") as file:
+                return mtime, self.get_file_tokens(file.read())
+        except OSError:
+            return None
+
+    def load(self):
+        path = self.get_cache_path()
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != REFERENCE_CACHE_VERSION:
+            return
+
+        display_paths = data["paths"]
+        with self.lock:
+            for file_path, (mtime, tokens) in data["files"].items():
+                self.add_file(file_path, mtime, tokens, display_paths.get(file_path))
+
+    def save(self):
+        self.save_pending = False
+        # Entries are replaced instead of changed in place, so a shallow copy is a consistent snapshot
+        with self.lock:
+            files = dict(self.files)
+            display_paths = dict(self.display_paths)
+        data = {
+            "version": REFERENCE_CACHE_VERSION,
+            "files": files,
+            "paths": display_paths,
+        }
+        text = json.dumps(data, separators=(",", ":"))
+        with open(self.get_cache_path(), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def schedule_save(self, delay=5000):
+        # Saves after several file updates in a row are coalesced into one write
+        if self.save_pending:
+            return
+        self.save_pending = True
+        sublime.set_timeout_async(self.save, delay)
+
+    def add_file(
+        self,
+        path: str,
+        mtime: float,
+        tokens: Dict[str, List[int]],
+        display_path: Optional[str] = None,
+    ):
+        # Must be called with self.lock held, path must be normalized
+        self.remove_file(path)
+        self.files[path] = (mtime, tokens)
+        self.display_paths[path] = display_path or path
+        for token, lines in tokens.items():
+            self.references.setdefault(token, dict())[path] = lines
+
+    def remove_file(self, path: str):
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        self.display_paths.pop(path, None)
+        for token in entry[1]:
+            paths = self.references.get(token)
+            if paths is None:
+                continue
+            paths.pop(path, None)
+            if not paths:
+                del self.references[token]
+
+    def build_async(self, roots: Iterable[str]):
+        """
+        Bring the index up to date with the files under roots on a background thread
+        """
+        roots = tuple(x for x in roots if x)
+        if self.building:
+            return
+        self.building = True
+        self.roots = roots
+        threading.Thread(target=lambda: self.build(roots), daemon=True).start()
+
+    def build(self, roots: Tuple[str, ...]):
+        try:
+            if not self.files:
+                self.load()
+
+            # Compare the modification times of the files on disk to the ones in the index
+            found = dict()
+            # Normalized path -> the path as it was found
+            found_paths = dict()
+            for root in roots:
+                for dirpath, dirnames, filenames in os.walk(root):
+                    for filename in filenames:
+                        if filename.endswith(self.extensions):
+                            file_path = os.path.join(dirpath, filename)
+                            path = normalize_path(file_path)
+                            try:
+                                found[path] = os.path.getmtime(path)
+                            except OSError:
+                                continue
+                            found_paths[path] = file_path
+
+            changed = [
+                x
+                for x, mtime in found.items()
+                if x not in self.files or self.files[x][0] != mtime
+            ]
+            removed = [x for x in self.files if x not in found]
+
+            with ThreadPoolExecutor() as executor:
+                results = list(
+                    executor.map(
+                        self.read_file_tokens, (found_paths[x] for x in changed)
+                    )
+                )
+
+            with self.lock:
+                for path in removed:
+                    self.remove_file(path)
+                for path, result in zip(changed, results):
+                    if result is not None:
+                        self.add_file(path, *result, found_paths[path])
+
+            self.ready = True
+            if changed or removed:
+                self.save()
+        finally:
+            self.building = False
+
+    def is_indexed_path(self, path: str) -> bool:
+        path = normalize_path(path)
+        return path.endswith(self.extensions) and any(
+            path.startswith(normalize_path(x) + os.sep) for x in self.roots
+        )
+
+    def update_file(self, path: str, text: str):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        tokens = self.get_file_tokens(text)
+        with self.lock:
+            self.add_file(normalize_path(path), mtime, tokens, path)
+        self.schedule_save()
+
+    def get_display_paths(self, paths: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        # Must be called with self.lock held
+        return {self.display_paths.get(p, p): lines for p, lines in paths.items()}
+
+    def find(self, key: str) -> List[Tuple[str, int]]:
+        """
+        Return a sorted list of (path, line) for every line that key is on
+        Keys that are not a single identifier are looked up by their least common identifier and then checked against the line
+        """
+        if word_re.fullmatch(key):
+            with self.lock:
+                paths = self.get_display_paths(self.references.get(key, {}))
+            return sorted((p, x) for p, lines in paths.items() for x in lines)
+        return [(path, line) for path, line, _ in self.iter_references(key)]
+
+    def iter_references(self, key: str) -> Iterator[Tuple[str, int, str]]:
+        """
+        Yield (path, line, text of the line) for every line that key is on, sorted by path and line
+        This reads the files the references are in, so it should only be used off the ui thread.
+        """
+        key_re = None
+        with self.lock:
+            if word_re.fullmatch(key):
+                paths = self.get_display_paths(self.references.get(key, {}))
+            else:
+                parts = [x for x in word_re.findall(key) if not x.isdigit()]
+                if not parts:
+                    return
+                paths = self.get_display_paths(
+                    min(
+                        (self.references.get(x, {}) for x in parts),
+                        key=len,
+                    )
+                )
+                key_re = re.compile(r"\b" + re.escape(key) + r"\b")
+
+        for path, lines in sorted(paths.items()):
+            try:
+                with open(path, "r", encoding="utf-8-sig", errors="replace") as file:
+                    file_lines = file.read().split("\n")
+            except OSError:
+                continue
+            for x in sorted(lines):
+                if x > len(file_lines):
+                    continue
+                text = file_lines[x - 1]
+                if key_re is None or key_re.search(text):
+                    yield path, x, text
+
+
+class GuiReferenceIndex(ReferenceIndex):
+    """
+    Index of the types and templates referenced in gui files
+    """
+
+    cache_name = "gui_references_cache.json"
+    extensions = (".gui",)
+
+    def get_file_tokens(self, text: str) -> Dict[str, List[int]]:
+        return get_gui_tokens(text)
+
+    def get_lines(self, key: str) -> Dict[str, List[int]]:
+        """
+        Return a dictionary of path -> line numbers for the gui files that reference key
+        """
+        with self.lock:
+            return self.get_display_paths(self.references.get(key, {}))
+
+
+# Plugin name -> ReferenceIndex
+reference_indexes: Dict[str, ReferenceIndex] = dict()
+gui_reference_indexes: Dict[str, GuiReferenceIndex] = dict()
+
+
+def get_reference_index(plugin_name: str) -> ReferenceIndex:
+    index = reference_indexes.get(plugin_name)
+    if index is None:
+        index = ReferenceIndex(plugin_name)
+        reference_indexes[plugin_name] = index
+    return index
+
+
+def get_gui_reference_index(plugin_name: str) -> GuiReferenceIndex:
+    index = gui_reference_indexes.get(plugin_name)
+    if index is None:
+        index = GuiReferenceIndex(plugin_name)
+        gui_reference_indexes[plugin_name] = index
+    return index
+
+
+def update_reference_indexes(view: sublime.View):
+    """
+    Update every reference index that includes the file of view, used after a view is saved
+    """
+    path = view.file_name()
+    if not path:
+        return
+
+    for index in list(reference_indexes.values()) + list(
+        gui_reference_indexes.values()
+    ):
+        if index.ready and index.is_indexed_path(path):
+            text = view.substr(sublime.Region(0, view.size()))
+            sublime.set_timeout_async(lambda index=index: index.update_file(path, text))
+
+
+class ReferencesPanel:
+    """
+    Output panel that lists references as path:line: text so they can be opened from the panel
+    The results are added to the panel in chunks so the first ones show up right away
+    """
+
+    def __init__(self, window: sublime.Window, chunk_size=200):
+        self.window = window
+        self.chunk_size = chunk_size
+
+    def create(self):
+        self.output_view = self.window.create_output_panel("references")
+        s = self.output_view.settings()
+        s.set("result_file_regex", r"^(.+):(\d+): ")
+        s.set("word_wrap", False)
+        s.set("line_numbers", False)
+        s.set("gutter", False)
+        s.set("scroll_past_end", False)
+        # Create the panel a second time so it picks up the result regex
+        self.window.create_output_panel("references")
+        self.window.run_command("show_panel", {"panel": "output.references"})
+
+    def show(self, key: str, references: List[Tuple[str, int]]):
+        self.create()
+        self.append(f"{len(references)} references to {key}\n\n")
+        sublime.set_timeout_async(lambda: self.stream_results(references), 0)
+
+    def show_search(self, key: str, index: "ReferenceIndex"):
+        """
+        Search index for key on the async thread and add the references to the panel as they are found
+        """
+        self.create()
+        self.append(f"Finding references to {key}...\n\n")
+        sublime.set_timeout_async(lambda: self.stream_search(key, index), 0)
+
+    def stream_search(self, key: str, index: "ReferenceIndex"):
+        lines = list()
+        count = 0
+        for path, line, text in index.iter_references(key):
+            count += 1
+            lines.append(f"{path}:{line}: {text.strip()}\n")
+            if len(lines) >= self.chunk_size:
+                self.append("".join(lines))
+                lines = list()
+
+        lines.append(f"\n{count} references to {key}\n")
+        self.append("".join(lines))
+
+    def stream_results(self, references: List[Tuple[str, int]]):
+        lines = list()
+        file_path = ""
+        file_lines: List[str] = list()
+        for path, line in references:
+            if path != file_path:
+                file_path = path
+                try:
+                    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+                        file_lines = f.read().split("\n")
+                except OSError:
+                    file_lines = list()
+
+            text = file_lines[line - 1].strip() if line <= len(file_lines) else ""
+            lines.append(f"{path}:{line}: {text}\n")
+            if len(lines) >= self.chunk_size:
+                self.append("".join(lines))
+                lines = list()
+
+        if lines:
+            self.append("".join(lines))
+
+    def append(self, text: str):
+        self.output_view.run_command(
+            "append", {"characters": text, "force": True, "scroll_to_end": False}
+        )
+
+
+class JominiFindAllReferencesCommand:
+    """
+    Find every reference to a key in the mod and game files and list them in an output panel
+    """
+
+    def __init__(
+        self,
+        plugin_name: str,
+        settings: sublime.Settings,
+        window: sublime.Window,
+        chunk_size=200,
+    ):
+        self.plugin_name = plugin_name
+        self.settings = settings
+        self.window = window
+        self.chunk_size = chunk_size
+
+    def _run(self, key: str = ""):
+        if not key:
+            view = self.window.active_view()
+            if not view or not len(view.sel()):
+                return
+            key = view.substr(view.word(view.sel()[0].a)).strip()
+        if not key:
+            return
+
+        index = get_reference_index(self.plugin_name)
+        if not index.ready:
+            index.build_async(
+                (self.settings.get("PathsToModFiles") or [])
+                + [self.settings.get("GameFilesPath")]
+            )
+            sublime.status_message("Reference index is still being built")
+            return
+
+        ReferencesPanel(self.window, self.chunk_size).show_search(key, index)
@@ -0,0 +1,88 @@
+"""
+Small background job scheduler built on top of set_timeout_async.
+Jobs run one at a time on the async thread in priority order, interactive work is always picked before indexing and indexing before cache flushes.
+Jobs scheduled with a key are coalesced, scheduling a key again cancels the job that is still waiting so only the newest one runs.
+Jobs are not interrupted once they start, so long work should be split into several jobs, like game objects being created one class per job.
+"""
+
+import heapq
+import itertools
+import threading
+import traceback
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import sublime
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_INDEXING = 1
+PRIORITY_CACHE_FLUSH = 2
+
+
+class Job:
+    __slots__ = ("func", "priority", "key", "cancelled")
+
+    def __init__(self, func: Callable, priority: int, key: Optional[Hashable]):
+        self.func = func
+        self.priority = priority
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class JobScheduler:
+    def __init__(self):
+        self._queue: List[Tuple[int, int, Job]] = list()
+        self._pending: Dict[Hashable, Job] = dict()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def schedule(
+        self,
+        func: Callable,
+        priority=PRIORITY_INDEXING,
+        key: Optional[Hashable] = None,
+    ) -> Job:
+        """
+        Queue func to run on the async thread
+        If a job with the same key is still waiting it is cancelled and replaced by this one
+        """
+        job = Job(func, priority, key)
+        with self._lock:
+            if key is not None:
+                old_job = self._pending.get(key)
+                if old_job is not None:
+                    old_job.cancel()
+                self._pending[key] = job
+            heapq.heappush(self._queue, (priority, next(self._counter), job))
+            if not self._running:
+                self._running = True
+                sublime.set_timeout_async(self._run_next, 0)
+        return job
+
+    def _pop(self) -> Optional[Job]:
+        with self._lock:
+            while self._queue:
+                job = heapq.heappop(self._queue)[2]
+                if job.key is not None and self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+                if not job.cancelled:
+                    return job
+            self._running = False
+            return None
+
+    def _run_next(self):
+        job = self._pop()
+        if job is None:
+            return
+
+        try:
+            job.func()
+        except Exception:
+            print(f"JominiTools: Background job {job.key} failed")
+            traceback.print_exc()
+
+        # Only one job runs per callback so other async events can be handled in between jobs
+        sublime.set_timeout_async(self._run_next, 0)
@@ -7,85 +7,46 @@ from typing import List
 
 import sublime
 
-from .utils import get_index
+from .view_index import get_view_index
 
 
 class ScopeMatch:
-    def get_regions(self, view: sublime.View, selector: str, view_str: str):
-        start_brackets = view.find_by_selector(selector)
-        return [
-            sublime.Region(br.a, get_index(view_str, br.a)) for br in start_brackets
-        ]
+    def in_block(self, view: sublime.View, enclosing: List[int], selector: str) -> bool:
+        return any(view.match_selector(x, selector) for x in enclosing)
 
     def simple_scope_match(self, view: sublime.View):
         selection = view.sel()
         if not selection[0].empty():
             return
 
-        view_str = view.substr(sublime.Region(0, view.size()))
+        # Only the { of the blocks around the cursor are looked at, found from the parse tree of the view index
+        index = get_view_index(view)
+        brackets = index.get_enclosing_brackets(*view.rowcol(selection[0].a))
+        enclosing = [view.text_point(row, col) for row, col in brackets]
 
-        # Get the starting bracket index from the syntax scopes
-        trigger_regions = self.get_regions(view, "meta.trigger.bracket", view_str)
-        effect_regions = self.get_regions(view, "meta.effect.bracket", view_str)
-        mtth_regions = self.get_regions(view, "meta.value.bracket", view_str)
-        modifier_regions = self.get_regions(view, "meta.modifier.bracket", view_str)
+        in_trigger = self.in_block(view, enclosing, "meta.trigger.bracket")
+        in_effect = self.in_block(view, enclosing, "meta.effect.bracket")
+        in_value = self.in_block(view, enclosing, "meta.value.bracket")
+        in_modifier = self.in_block(view, enclosing, "meta.modifier.bracket")
 
-        self.show_status(selection[0].a, trigger_regions, "trigger", view)
-
-        # Have to account for trigger fields inside of effect fields, definetly a better way to do this.
-        for block in effect_regions:
-            if block.a <= selection[0].a <= block.b:
-                view.set_status("effect", "Effect Field")
-                self.effect_field = True
-                for block in trigger_regions:
-                    if block.a <= selection[0].a <= block.b:
-                        view.erase_status("effect")
-                        self.effect_field = False
-                        view.set_status("trigger", "Trigger Field")
-                        self.trigger_field = True
-                        break
-                    else:
-                        view.erase_status("trigger")
-                        self.trigger_field = False
-                break
-            else:
-                view.erase_status("effect")
-                self.effect_field = False
-
-        self.show_status(selection[0].a, modifier_regions, "modifier", view)
-
-        self.show_status(selection[0].a, mtth_regions, "value", view)
+        # Trigger fields inside of effect fields are trigger fields
+        self.trigger_field = in_trigger
+        self.effect_field = in_effect and not in_trigger
+        self.modifier_field = in_modifier
+        self.mtth_field = in_value
 
+        self.show_status(view, "trigger", self.trigger_field)
+        self.show_status(view, "effect", self.effect_field)
         # For actual mtth fields that have a modifier = {} block inside of them, remove the modifier status
-        if self.mtth_field and self.modifier_field:
-            view.erase_status("modifier")
+        self.show_status(view, "modifier", in_modifier and not in_value)
+        self.show_status(view, "value", in_value)
 
-    def show_status(
-        self,
-        selection: int,
-        regions: List[sublime.Region],
-        status: str,
-        view: sublime.View,
-    ):
-        for block in regions:
-            if block.a <= selection <= block.b:
-                view.set_status(status, status.title() + " Field")
-                if status == "trigger":
-                    self.trigger_field = True
-                elif status == "effect":
-                    self.effect_field = True
-                elif status == "modifier":
-                    self.modifier_field = True
-                elif status == "value":
-                    self.mtth_field = True
-                break
-            else:
-                view.erase_status(status)
-                if status == "trigger":
-                    self.trigger_field = False
-                elif status == "effect":
-                    self.effect_field = False
-                elif status == "modifier":
-                    self.modifier_field = False
-                elif status == "value":
-                    self.mtth_field = False
+    def show_status(self, view: sublime.View, status: str, show: bool):
+        # The status bar is only touched when the status changes
+        text = status.title() + " Field" if show else ""
+        if view.get_status(status) == text:
+            return
+        if text:
+            view.set_status(status, text)
+        else:
+            view.erase_status(status)
@@ -0,0 +1,58 @@
+"""
+Tokenizer for Jomini script.
+Lines are tokenized one at a time so the view index only has to tokenize the lines that were edited.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+WORD = 0
+STRING = 1
+OPERATOR = 2
+OPEN = 3
+CLOSE = 4
+
+script_token_re = re.compile(
+    r'(#.*)|("(?:[^"\\]|\\.)*"?)|(\?=|[<>!=]=?)|(\{)|(\})|([^\s{}=<>!?#"]+)'
+)
+# Regex group -> token kind, comments are dropped
+group_kinds = (None, None, STRING, OPERATOR, OPEN, CLOSE, WORD)
+
+# (column, kind, text)
+LineToken = Tuple[int, int, str]
+
+
+def tokenize_line(line: str) -> List[LineToken]:
+    tokens = list()
+    for match in script_token_re.finditer(line):
+        kind = group_kinds[match.lastindex]  # type: ignore
+        if kind is not None:
+            tokens.append((match.start(), kind, match.group()))
+    return tokens
+
+
+def has_brackets(tokens: List[LineToken]) -> bool:
+    for token in tokens:
+        if token[1] == OPEN or token[1] == CLOSE:
+            return True
+    return False
+
+
+def get_block_key(previous: List[LineToken]) -> Optional[str]:
+    """
+    Return the key of a block given the last (up to 3) tokens before its { that come after the previous brace
+    """
+    if not previous:
+        return None
+    if previous[-1][1] == OPERATOR:
+        if len(previous) >= 2 and previous[-2][1] != OPERATOR:
+            return previous[-2][2]
+        return None
+    if (
+        len(previous) >= 3
+        and previous[-2][1] == OPERATOR
+        and previous[-3][1] != OPERATOR
+    ):
+        # color = hsv { ... }
+        return previous[-3][2]
+    return previous[-1][2]
@@ -6,6 +6,7 @@ from abc import ABC, abstractmethod
 import sublime
 
 from .utils import get_syntax_name, IterViews
+from .view_index import get_view_index
 
 
 def get_views_with_shown_textures() -> Set[sublime.View]:
@@ -139,21 +140,26 @@ class JominiShowAllTexturesCommand(JominiShowTextureBase):
         if view is None:
             return
 
-        texture_list = [
-            x
-            for x in view.lines(sublime.Region(0, view.size()))
-            if ".dds" in view.substr(x)
-        ]
-        game_files_path = settings.get("GameFilesPath")
+        # The texture paths are the values in the parse tree of the view, so paths in comments are skipped
+        index = get_view_index(view)
+        textures = list()
+        with index.lock:
+            for node in index.get_tree().iter_nodes():
+                if node.value is None or ".dds" not in node.value:
+                    continue
+                start = node.value.find("gfx")
+                end = node.value.find(".dds", start)
+                if start != -1 and end != -1:
+                    row, col = node.value_start  # type: ignore
+                    textures.append(
+                        (node.value[start : end + 4], view.text_point(row, col + start))
+                    )
 
-        for line, i in zip(texture_list, range(settings.get("MaxToggleTextures"))):  # type: ignore
-            texture_raw_start = view.find("gfx", line.a)
-            texture_raw_end = view.find(".dds", line.a)
-            texture_raw_region = sublime.Region(texture_raw_start.a, texture_raw_end.b)
-            texture_raw_path = view.substr(texture_raw_region)
+        game_files_path = settings.get("GameFilesPath")
+        for texture_raw_path, point in textures[: settings.get("MaxToggleTextures")]:  # type: ignore
             full_texture_path = game_files_path + "/" + texture_raw_path  # type: ignore
             full_texture_path = full_texture_path.replace("\\", "/")
-            self.show_texture(full_texture_path, texture_raw_start.a)
+            self.show_texture(full_texture_path, point)
 
 
 class JominiToggleAllTexturesCommand:
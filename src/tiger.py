@@ -52,63 +52,50 @@ class TigerJsonObject:
             5293 |     type cpt_button_large = margin_widget {
                  |          ^^^^^^^^^^^^^^^^ <-- the other gui type is here
         """
-        out_str = f"{self.severity}({self.key}): {self.message}\n"
+        out = [f"{self.severity}({self.key}): {self.message}\n"]
         self._max_line_num_length = max(
             len(str(location.linenr)) for location in self.locations
         )
 
-        previous_paths = list()
+        previous_paths = set()
         for i, location in enumerate(self.locations):
-            line_num_padding = " "
-            low_num_padding = ""
-            low_num_arrow_padding = ""
-            arrows = ""
             line_len = len(str(location.linenr))
-
             # The initial padding is dependent on the line number with the longest length
-            if line_len < self._max_line_num_length:
-                for j in range(self._max_line_num_length - line_len):
-                    low_num_padding += " "
-            if low_num_padding:
-                low_num_arrow_padding = " "
-
-            for j in range(line_len):
-                line_num_padding += " "
+            low_num_padding = " " * (self._max_line_num_length - line_len)
+            low_num_arrow_padding = " " if low_num_padding else ""
+            line_num_padding = " " * (line_len + 1)
 
             if location.column:
-                location.column -= 1
-                column_padding = " " * location.column
-
-                if location.length:
-                    arrows = "^" * location.length
-
+                column_padding = " " * (location.column - 1)
+                arrows = "^" * location.length if location.length else ""
                 line = location.line.replace("\t", " ")
                 tag = f"<-- {location.tag}" if location.tag else ""
-                added_arrow = "--> " if i < 1 else "--> "
 
                 if location.fullpath not in previous_paths:
-                    out_str += f"{line_num_padding}{low_num_arrow_padding}{added_arrow}[{location.origin}] {location.path}\n"
-                previous_paths.append(location.fullpath)
+                    out.append(
+                        f"{line_num_padding}{low_num_arrow_padding}--> [{location.origin}] {location.path}\n"
+                    )
+                previous_paths.add(location.fullpath)
                 # NOTE: There is an invisible chararcter here on both sides of "⁭{line}⁭"⁭
                 # This is used in Tiger.sublime-syntax to indicate where the embedding for script lines starts and ends
                 # Without it there isn't a good way to indicate where the embedding needs to end due to limitations with the 'escape' keyword of sublime-syntaxes
-                out_str += f"{low_num_padding}{location.linenr} |⁭{line}⁭\n"
-                out_str += f"{low_num_padding}{line_num_padding}|{column_padding}{arrows} {tag}\n"
+                out.append(f"{low_num_padding}{location.linenr} |⁭{line}⁭\n")
+                out.append(
+                    f"{low_num_padding}{line_num_padding}|{column_padding}{arrows} {tag}\n"
+                )
 
                 if i + 1 == len(self.locations):
                     if self.info:
-                        out_str += f"{line_num_padding}= Info: {self.info}\n"
-                    out_str += "\n"
+                        out.append(f"{line_num_padding}= Info: {self.info}\n")
+                    out.append("\n")
             else:
                 # If no column exists than it is just a "Info" message
-                added_arrow = "--> " if i < 1 else "--> "
-
                 if location.path not in previous_paths:
-                    out_str += f" {added_arrow}[{location.origin}] {location.path}\n"
+                    out.append(f" --> [{location.origin}] {location.path}\n")
                     if i + 1 == len(self.locations) and self.info:
-                        out_str += f"  = Info: {self.info}\n"
+                        out.append(f"  = Info: {self.info}\n")
 
                 if not location.line:
-                    out_str += "⁭\n"
+                    out.append("⁭\n")
 
-        return out_str
+        return "".join(out)
@@ -2,23 +2,251 @@
 All the code for handling the integration of imperator-tiger into the plugin.
 """
 
+import bisect
 import json
 import os
 import sys
+from typing import Dict, List, Optional, Tuple, Union
 
 import Default.exec
 import sublime
 import sublime_plugin
 
 from .tiger import TigerJsonObject
-from .css import CSS
-from .utils import get_file_name
+from .css import make_popup
+from .utils import get_file_name, normalize_path
 
 
 def get_tiger_cache_path(plugin_name):
     return os.path.join(sublime.cache_path(), plugin_name, "tiger.json")
 
 
+severity_colors = {
+    "fatal": "red",
+    "error": "red",
+    "warning": "yellow",
+    "untidy": "yellow",
+    "tips": "green",
+}
+
+
+class TigerDiagnostic:
+    """
+    A tiger error at one location in a file
+    """
+
+    __slots__ = ("severity", "key", "info", "message", "linenr", "column", "length")
+
+    def __init__(self, severity, key, info, message, linenr, column, length):
+        self.severity = severity
+        self.key = key
+        self.info = info
+        self.message = message
+        self.linenr = linenr
+        self.column = column
+        self.length = length
+
+    def to_dict(self) -> dict:
+        return {x: getattr(self, x) for x in self.__slots__}
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        # Errors without a column are info messages about the whole line
+        return (self.linenr or 0, self.column or 0)
+
+    def contains(self, row: int, col: int) -> bool:
+        """
+        Check if the 0 based row and column of a view are in the text of the error
+        """
+        if self.linenr != row + 1 or not self.column:
+            return False
+        start = self.column - 1
+        return start <= col <= start + (self.length or 0)
+
+
+class TigerFileDiagnostics:
+    """
+    The errors in one file sorted by their line and column, with the (line, column) of every error in positions
+    These are never changed after they are created so they can be read from any thread.
+    """
+
+    __slots__ = ("diagnostics", "positions")
+
+    def __init__(self, diagnostics: List[TigerDiagnostic]):
+        self.diagnostics = sorted(diagnostics, key=lambda x: x.position)
+        self.positions = [x.position for x in self.diagnostics]
+
+
+class TigerDiagnosticStore:
+    """
+    The errors in tiger.json grouped by the normalized path of the file they are in
+    The file is only parsed again when its modification time changes.
+    The errors of each file are sorted by their line and column so the error at a position is found with a binary search.
+    """
+
+    def __init__(self, plugin_name: str):
+        self.plugin_name = plugin_name
+        self.mtime: Optional[float] = None
+        self.files: Dict[str, TigerFileDiagnostics] = dict()
+
+    def get_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(get_tiger_cache_path(self.plugin_name))
+        except OSError:
+            return None
+
+    def is_stale(self) -> bool:
+        return self.get_mtime() != self.mtime
+
+    def refresh(self):
+        path = get_tiger_cache_path(self.plugin_name)
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("[]")
+
+        mtime = self.get_mtime()
+        if mtime == self.mtime:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        self.set_data(data)
+        self.mtime = mtime
+
+    def set_data(self, data: List[dict]):
+        files = dict()
+        for path, diagnostics in self.group_by_path(data).items():
+            files[path] = TigerFileDiagnostics(diagnostics)
+        # Replaced all at once so readers on other threads never see a partial result
+        self.files = files
+
+    def clear(self):
+        self.files = dict()
+
+    def add_objects(self, data: List[dict]):
+        """
+        Add the errors of tiger json objects to the ones that are already loaded, used while tiger's output is streamed in
+        """
+        for path, diagnostics in self.group_by_path(data).items():
+            old = self.files.get(path)
+            if old is not None:
+                diagnostics = old.diagnostics + diagnostics
+            self.files[path] = TigerFileDiagnostics(diagnostics)
+
+    def group_by_path(self, data: List[dict]) -> Dict[str, List[TigerDiagnostic]]:
+        files: Dict[str, List[TigerDiagnostic]] = dict()
+        for obj in data:
+            # Only the first location in each file is used, the same as the display() function
+            previous_locations = set()
+            for j in obj["locations"]:
+                path = normalize_path(j["fullpath"])
+                if path in previous_locations:
+                    continue
+                previous_locations.add(path)
+                files.setdefault(path, []).append(
+                    TigerDiagnostic(
+                        obj["severity"],
+                        obj["key"],
+                        obj["info"],
+                        obj["message"],
+                        j["linenr"],
+                        j["column"],
+                        j["length"],
+                    )
+                )
+        return files
+
+    def get_file_diagnostics(self, path: Optional[str]) -> List[TigerDiagnostic]:
+        if not path:
+            return []
+        entry = self.files.get(normalize_path(path))
+        return entry.diagnostics if entry is not None else []
+
+    def find_diagnostic(
+        self, path: Optional[str], row: int, col: int
+    ) -> Optional[TigerDiagnostic]:
+        """
+        Return the error at the 0 based row and column of the file at path
+        """
+        if not path:
+            return None
+        entry = self.files.get(normalize_path(path))
+        if entry is None:
+            return None
+
+        # Errors that start after the position can't contain it, the ones before it are checked back to the start of the line
+        diagnostics = entry.diagnostics
+        i = bisect.bisect_right(entry.positions, (row + 1, col + 1)) - 1
+        while i >= 0 and diagnostics[i].linenr == row + 1:
+            if diagnostics[i].contains(row, col):
+                return diagnostics[i]
+            i -= 1
+        return None
+
+
+class TigerJsonStream:
+    """
+    Parses the json array that tiger outputs one object at a time as the output comes in
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.started = False
+        self.finished = False
+
+    def feed(self, text: str) -> List[dict]:
+        """
+        Return the objects that were completed by text, the rest of an incomplete object is kept for the next call
+        """
+        if self.finished:
+            return []
+        buffer = self.buffer + text
+        pos = 0
+        if not self.started:
+            start = buffer.find("[")
+            if start == -1:
+                self.buffer = ""
+                return []
+            self.started = True
+            pos = start + 1
+
+        objects = list()
+        length = len(buffer)
+        while True:
+            while pos < length and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= length:
+                break
+            if buffer[pos] == "]":
+                self.finished = True
+                pos += 1
+                break
+            try:
+                obj, pos = self.decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # The object isn't complete yet
+                break
+            objects.append(obj)
+
+        self.buffer = buffer[pos:]
+        return objects
+
+
+# Plugin name -> TigerDiagnosticStore
+tiger_stores: Dict[str, TigerDiagnosticStore] = dict()
+
+
+def get_tiger_store(plugin_name: str) -> TigerDiagnosticStore:
+    store = tiger_stores.get(plugin_name)
+    if store is None:
+        store = TigerDiagnosticStore(plugin_name)
+        tiger_stores[plugin_name] = store
+    return store
+
+
 class JominiTigerEventListener:
     def __init__(self, plugin_name: str):
         self.plugin_name = plugin_name
@@ -27,38 +255,23 @@ class JominiTigerEventListener:
         if not settings.get("TigerShowErrorsInline"):
             return
 
-        tiger_objects = get_tiger_objects(self.plugin_name)
-        path = view.file_name()
-        if path not in tiger_objects:
+        store = get_tiger_store(self.plugin_name)
+        store.refresh()
+        file_errors = store.get_file_diagnostics(view.file_name())
+        if not file_errors:
             return
 
-        file_errors = tiger_objects[path]
         error_regions = list()
         warning_regions = list()
         tips_regions = list()
-        if isinstance(file_errors, list):
-            for i in file_errors:
-                point = view.text_point(i["linenr"] - 1, i["column"] - 1)
-                length = i["length"] if i["length"] is not None else 0
-                if i["severity"] == "fatal" or i["severity"] == "error":
-                    error_regions.append(sublime.Region(point, point + length))
-                if i["severity"] == "warning" or i["severity"] == "untidy":
-                    warning_regions.append(sublime.Region(point, point + length))
-                if i["severity"] == "tips":
-                    tips_regions.append(sublime.Region(point, point + length))
-        else:
-            point = view.text_point(
-                file_errors["linenr"] - 1, file_errors["column"] - 1
-            )
-            length = file_errors["length"] if file_errors["length"] is not None else 0
-            if file_errors["severity"] == "fatal" or file_errors["severity"] == "error":
+        for i in file_errors:
+            point = view.text_point(i.linenr - 1, i.column - 1)
+            length = i.length if i.length is not None else 0
+            if i.severity == "fatal" or i.severity == "error":
                 error_regions.append(sublime.Region(point, point + length))
-            if (
-                file_errors["severity"] == "warning"
-                or file_errors["severity"] == "untidy"
-            ):
+            if i.severity == "warning" or i.severity == "untidy":
                 warning_regions.append(sublime.Region(point, point + length))
-            if file_errors["severity"] == "tips":
+            if i.severity == "tips":
                 tips_regions.append(sublime.Region(point, point + length))
 
         if error_regions:
@@ -75,63 +288,25 @@ class JominiTigerEventListener:
         if not view:
             return
 
-        path = view.file_name()
-        tiger_objects = get_tiger_objects(self.plugin_name)
-        if path not in tiger_objects:
-            return
-
-        file_errors = tiger_objects[path]
-        file_error = ""
-        if isinstance(file_errors, list):
-            for i in file_errors:
-                # We can deduce the current error being hovered over by knowing the Region of the row and column it is in
-                region_start = view.text_point(i["linenr"] - 1, i["column"] - 1)
-                length = i["length"] if i["length"] is not None else 0
-                region_end = region_start + length
-                error_region = sublime.Region(region_start, region_end)
-                if error_region.contains(point):
-                    file_error = i
-        else:
-            region_start = view.text_point(
-                file_errors["linenr"] - 1, file_errors["column"] - 1
-            )
-            region_end = region_start + file_errors["length"]
-            error_region = sublime.Region(region_start, region_end)
-            if error_region.contains(point):
-                file_error = file_errors
+        store = get_tiger_store(self.plugin_name)
+        if store.is_stale():
+            # Parsing happens off the ui thread, this hover uses the errors that are already loaded
+            sublime.set_timeout_async(store.refresh, 0)
 
+        file_error = store.find_diagnostic(view.file_name(), *view.rowcol(point))
         if not file_error:
             return
 
-        error = [x for x in view.get_regions("region.redish") if x.contains(point)]
-        warning = [x for x in view.get_regions("region.yellowish") if x.contains(point)]
-        tips = [x for x in view.get_regions("region.greenish") if x.contains(point)]
-
-        info = file_error["info"]
+        info = file_error.info
         if not info:
             info = ""
         info = "<p>" + info + "</p>"
 
-        header_color = ""
-        if error:
-            header_color = "red"
-        if warning:
-            header_color = "yellow"
-        if tips:
-            header_color = "green"
-
-        header = f"{file_error['severity']}({file_error['key']})"
+        header_color = severity_colors.get(file_error.severity, "")
+        header = f"{file_error.severity}({file_error.key})"
         example = f'<h2 class="code-header {header_color}-text">{header}</h2>'
-        example += f'<div class="box-for-codebox"><div class="codebox"><code>{file_error["message"]}</code><br><code>{info}</code></div></div>'
-        hover_body = """
-            <body id="jomini-body">
-                <style>%s</style>
-                %s
-            </body>
-        """ % (
-            CSS().default,
-            example,
-        )
+        example += f'<div class="box-for-codebox"><div class="codebox"><code>{file_error.message}</code><br><code>{info}</code></div></div>'
+        hover_body = make_popup(example)
 
         view.show_popup(
             hover_body,
@@ -146,50 +321,43 @@ class JominiTigerEventListener:
 
 
 # Tiger json object creation
-def get_tiger_objects(plugin_name: str):
-    tiger_objects = dict()
-    if not os.path.exists(get_tiger_cache_path(plugin_name)):
-        with open(get_tiger_cache_path(plugin_name), "w", encoding="utf-8") as file:
+def get_tiger_objects(plugin_name: str) -> Dict[str, Union[dict, List[dict]]]:
+    """
+    Return the errors in tiger.json by the full path of their file as tiger wrote it, in the format used before TigerDiagnosticStore
+    A file with one error has its error as a dictionary, a file with more has a list of them in the order they are in tiger.json.
+    """
+    path = get_tiger_cache_path(plugin_name)
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as file:
             file.write("[]")
-    with open(get_tiger_cache_path(plugin_name), "r", encoding="utf-8") as file:
+    with open(path, "r", encoding="utf-8") as file:
         data = json.load(file)
 
-    for i in data:
-        # Add location data to list in the same way the display() function does so the indexes stay the same
-        previous_locations = list()
-        for j in i["locations"]:
+    tiger_objects: Dict[str, Union[dict, List[dict]]] = dict()
+    for obj in data:
+        # Only the first location in each file is used, the same as the display() function
+        previous_locations = set()
+        for j in obj["locations"]:
             fullpath = j["fullpath"]
-            if fullpath not in previous_locations:
-                if fullpath in tiger_objects:
-                    old_data = tiger_objects[j["fullpath"]]
-                    new_data = {
-                        "severity": i["severity"],
-                        "key": i["key"],
-                        "info": i["info"],
-                        "message": i["message"],
-                        "linenr": j["linenr"],
-                        "column": j["column"],
-                        "length": j["length"],
-                    }
-                    if isinstance(old_data, list):
-                        old_data.append(new_data)
-                    else:
-                        old_data = [old_data, new_data]
-
-                    tiger_objects[j["fullpath"]] = old_data
-                else:
-                    tiger_objects[j["fullpath"]] = {
-                        "severity": i["severity"],
-                        "key": i["key"],
-                        "info": i["info"],
-                        "message": i["message"],
-                        "linenr": j["linenr"],
-                        "column": j["column"],
-                        "length": j["length"],
-                    }
-
-            previous_locations.append(j["fullpath"])
-
+            if fullpath in previous_locations:
+                continue
+            previous_locations.add(fullpath)
+            new_data = TigerDiagnostic(
+                obj["severity"],
+                obj["key"],
+                obj["info"],
+                obj["message"],
+                j["linenr"],
+                j["column"],
+                j["length"],
+            ).to_dict()
+            old_data = tiger_objects.get(fullpath)
+            if old_data is None:
+                tiger_objects[fullpath] = new_data
+            elif isinstance(old_data, list):
+                old_data.append(new_data)
+            else:
+                tiger_objects[fullpath] = [old_data, new_data]
     return tiger_objects
 
 
@@ -215,47 +383,31 @@ class TigerInputHandler(sublime_plugin.ListInputHandler):
 
 
 class JominiTigerOutputCommand:
+    """
+    Show the output of the last tiger run in a panel or tab
+    The output is rendered and appended in chunks on the async thread,
+    and the annotations that open the files are only added to the part of the view that is visible.
+    """
+
     def __init__(
         self,
         plugin_name: str,
         settings: sublime.Settings,
         tiger_syntax_name: str,
         window: sublime.Window,
+        chunk_size=500,
+        annotation_poll_interval=250,
     ):
         self.plugin_name = plugin_name
         self.settings = settings
         self.tiger_syntax_name = tiger_syntax_name
         self.window = window
+        self.chunk_size = chunk_size
+        self.annotation_poll_interval = annotation_poll_interval
 
     def _run(self, view_type):
         self.game_files_path = self.settings.get("GameFilesPath")
 
-        with open(
-            get_tiger_cache_path(self.plugin_name), "r", encoding="utf-8"
-        ) as file:
-            data = json.load(file)
-
-        view_text = str()
-        self.path_locations = list()
-        for i in data:
-            # Add location data to list in the same way the display() function does so the indexes stay the same
-            previous_locations = list()
-            for j in i["locations"]:
-                if j["fullpath"] not in previous_locations:
-                    self.path_locations.append((j["linenr"], j["column"]))
-                previous_locations.append(j["fullpath"])
-
-            obj = TigerJsonObject(
-                i["confidence"],
-                i["info"],
-                i["key"],
-                i["locations"],
-                i["message"],
-                i["severity"],
-            )
-
-            view_text += obj.display()
-
         if view_type == "Panel":
             if self.window.find_output_panel("exec") is None:
                 self.output_view = self.window.create_output_panel("exec")
@@ -270,9 +422,9 @@ class JominiTigerOutputCommand:
             self.output_view.set_scratch(True)
 
         if self.output_view:
-            self.view_creation(view_text)
+            self.view_creation()
 
-    def view_creation(self, view_text):
+    def view_creation(self):
         self.window.focus_view(self.output_view)
         self.output_view.set_read_only(True)
         self.output_view.assign_syntax(f"{self.tiger_syntax_name}.sublime-syntax")
@@ -281,37 +433,94 @@ class JominiTigerOutputCommand:
         s.set("line_numbers", False)
         s.set("gutter", False)
         s.set("scroll_past_end", False)
-        if not view_text:
-            view_text = "tiger found no errors :)"
+
+        self.path_locations: List[Tuple[int, int]] = list()
+        self.path_regions: List[sublime.Region] = list()
+        self.path_region_starts: List[int] = list()
+        self.annotated_region = None
+        sublime.set_timeout_async(self.render_output, 0)
+
+    def render_output(self):
+        with open(
+            get_tiger_cache_path(self.plugin_name), "r", encoding="utf-8"
+        ) as file:
+            data = json.load(file)
+
+        chunk = list()
+        for i in data:
+            # Add location data to list in the same way the display() function does so the indexes stay the same
+            previous_locations = set()
+            for j in i["locations"]:
+                if j["fullpath"] not in previous_locations:
+                    self.path_locations.append((j["linenr"], j["column"]))
+                previous_locations.add(j["fullpath"])
+
+            obj = TigerJsonObject(
+                i["confidence"],
+                i["info"],
+                i["key"],
+                i["locations"],
+                i["message"],
+                i["severity"],
+            )
+            chunk.append(obj.display())
+            if len(chunk) >= self.chunk_size:
+                if not self.append("".join(chunk)):
+                    return
+                chunk = list()
+
+        if chunk:
+            self.append("".join(chunk))
+        if not data:
+            self.append("tiger found no errors :)")
+
+        sublime.set_timeout(self.update_annotations, 0)
+
+    def append(self, text: str) -> bool:
+        """
+        Append text to the output view, returns False if the view was closed
+        """
+        if not self.output_view.is_valid():
+            return False
         self.output_view.run_command(
-            "append", {"characters": view_text, "force": True, "scroll_to_end": True}
+            "append", {"characters": text, "force": True, "scroll_to_end": False}
         )
+        return True
 
-        self.add_annotations()
+    def update_annotations(self):
+        """
+        Annotate the paths in the visible part of the output, checked again every annotation_poll_interval ms while the view is open
+        """
+        if not self.output_view.is_valid():
+            return
 
-    def add_annotations(self):
-        regions = self.output_view.find_by_selector("string.file.path")
-        annotations = list()
+        visible = self.output_view.visible_region()
+        if visible != self.annotated_region:
+            self.annotated_region = visible
+            self.add_annotations(visible)
+        sublime.set_timeout(self.update_annotations, self.annotation_poll_interval)
+
+    def add_annotations(self, visible: sublime.Region):
+        if len(self.path_regions) < len(self.path_locations):
+            # The syntax might not have been applied to all of the output the last time
+            self.path_regions = self.output_view.find_by_selector("string.file.path")
+            self.path_region_starts = [x.a for x in self.path_regions]
+
+        # Annotate a screen above and below the visible region too so they are already there when scrolling
+        margin = visible.size()
+        start = max(
+            bisect.bisect_left(self.path_region_starts, visible.a - margin) - 1, 0
+        )
+        end = bisect.bisect_right(self.path_region_starts, visible.b + margin)
+        end = min(end, len(self.path_locations))
 
-        for i in range(len(regions)):
-            href_str = (
-                self.output_view.substr(regions[i]).lstrip(" ")
-                + ":"
-                + str(self.path_locations[i][0])
-                + ":"
-                + str(self.path_locations[i][1])
-            )
-            annotation_body = """
-                <body id="jomini-body">
-                    <style>%s</style>
-                    <a href="%s" >Open %s</a>
-                </body>
-            """ % (
-                CSS().default,
-                href_str,
-                self.output_view.substr(regions[i]),
-            )
-            annotations.append(annotation_body)
+        regions = self.path_regions[start:end]
+        annotations = list()
+        for i, region in enumerate(regions, start):
+            path = self.output_view.substr(region)
+            linenr, column = self.path_locations[i]
+            href_str = f"{path.lstrip(' ')}:{linenr}:{column}"
+            annotations.append(make_popup(f'<a href="{href_str}" >Open {path}</a>'))
 
         self.output_view.add_regions(
             "file_to_open",
@@ -339,6 +548,8 @@ class JominiExecuteTigerCommand:
     """
     Version of Default.exec.py specifically for executing tiger and piping it's output to a file.
     It is basically the same except it does not pull up the output panel and it only outputs the text the subprocess sends.
+    The json tiger outputs is written straight to the cache file and parsed as it comes in,
+    only the text before the json and a short summary are shown in the panel.
     """
 
     def __init__(self, plugin_name, exe_name, window):
@@ -346,6 +557,7 @@ class JominiExecuteTigerCommand:
         self.plugin_name = plugin_name
         self.exe_name = exe_name
         self.proc = None
+        self.json_file = None
 
     def _run(
         self,
@@ -394,6 +606,15 @@ class JominiExecuteTigerCommand:
         if working_dir != "":
             os.chdir(working_dir)
 
+        # A new run replaces one that is still going, its callbacks are ignored once self.proc changes
+        self.kill()
+
+        self.stream = TigerJsonStream()
+        self.error_count = 0
+        self.store = get_tiger_store(self.plugin_name)
+        self.json_path = get_tiger_cache_path(self.plugin_name) + ".tmp"
+        self.json_file = open(self.json_path, "w", encoding="utf-8")
+
         try:
             # Run process
             self.proc = Default.exec.AsyncProcess(
@@ -403,6 +624,19 @@ class JominiExecuteTigerCommand:
         except Exception as e:
             print(e)
             sublime.status_message("Build error")
+            self.json_file.close()
+            self.json_file = None
+            os.remove(self.json_path)
+
+    def kill(self):
+        # The json file is only open while the process is running
+        if self.json_file is None:
+            return
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc = None
+        self.json_file.close()
+        self.json_file = None
 
     def write(self, characters):
         self.output_view.run_command(
@@ -410,31 +644,48 @@ class JominiExecuteTigerCommand:
         )
 
     def on_data(self, proc, data):
-        if proc != self.proc:
+        if proc != self.proc or self.json_file is None:
             return
 
-        self.write(data)
+        if not self.stream.started:
+            # Find where the json starts by splitting off the header output
+            # This will break if there is a "[" in the header but that should never happen
+            json_start_index = data.find("[")
+            if json_start_index == -1:
+                self.write(data)
+                return
+            self.write(data[:json_start_index])
+            data = data[json_start_index:]
+            self.store.clear()
+
+        self.json_file.write(data)
+        objects = self.stream.feed(data)
+        if objects:
+            self.error_count += len(objects)
+            self.store.add_objects(objects)
+            sublime.status_message(
+                f"{self.exe_name} is running, {self.error_count} errors found..."
+            )
 
     def on_finished(self, proc):
-        if proc != self.proc:
+        if proc != self.proc or self.json_file is None:
             return
 
-        if not self.output_view:
-            text = ""
-        else:
-            text = self.output_view.substr(sublime.Region(0, self.output_view.size()))
-        # Find where the json starts by splitting off the header output
-        # This will break if there is a "[" in the header but that should never happen
-        json_start_index = text.find("[")
-
-        if json_start_index != -1:
-            tiger_json_output = text[json_start_index:]
-            with open(
-                get_tiger_cache_path(self.plugin_name), "w", encoding="utf-8"
-            ) as f:
-                f.write(tiger_json_output)
-            sublime.status_message(f"{self.exe_name} has finished running.")
-            sublime.set_timeout_async(lambda: get_tiger_objects(self.plugin_name), 0)
+        self.json_file.close()
+        self.json_file = None
+        if not self.stream.finished:
+            # Keep the errors from the last complete run
+            os.remove(self.json_path)
+            if self.stream.started:
+                self.store.mtime = None
+                sublime.set_timeout_async(self.store.refresh, 0)
+            return
+
+        os.replace(self.json_path, get_tiger_cache_path(self.plugin_name))
+        # The store already has everything in the file so it doesn't need to parse it again
+        self.store.mtime = self.store.get_mtime()
+        self.write(f"\n{self.exe_name} found {self.error_count} errors.\n")
+        sublime.status_message(f"{self.exe_name} has finished running.")
 
 
 class JominiRunTigerCommand:
@@ -23,6 +23,11 @@ def open_path(path: str):
         subprocess.Popen(("xdg-open", path))
 
 
+def normalize_path(path: str) -> str:
+    """Return path in a form that can be compared to other paths on the same system"""
+    return os.path.normcase(os.path.normpath(path))
+
+
 def is_file_in_directory(file_path: str, directory_path: str) -> bool:
     if not os.path.exists(file_path):
         return False
@@ -0,0 +1,286 @@
+"""
+Per buffer indexes of the text in open views.
+Indexes are created the first time a feature asks for one and are then kept up to date from the text changes sent to JominiViewIndexListener,
+so only the lines that were edited get tokenized again instead of the whole buffer.
+Each index has the token counts of the buffer, an inverted index of tokens to the lines they are on,
+the Jomini script tokens of every line, and a parse tree of the buffer with every statement and block and their keys and values.
+The parse tree is the one model of the structure of a buffer, features query it instead of scanning the text or the syntax scopes.
+Every index is versioned by the change_count of its buffer, if it ever falls behind it is rebuilt from the buffer.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import sublime
+
+from .parse_tree import ParseTree
+from .script_tokens import CLOSE, OPEN, LineToken, has_brackets, tokenize_line
+
+word_re = re.compile(r"\w+")
+
+# Token counts of every indexed buffer added together
+workspace_token_counts: Counter = Counter()
+
+
+def add_tokens(counter: Counter, tokens: Iterable[str]):
+    for token in tokens:
+        counter[token] += 1
+
+
+def remove_tokens(counter: Counter, tokens: Iterable[str]):
+    for token in tokens:
+        count = counter[token] - 1
+        if count > 0:
+            counter[token] = count
+        else:
+            del counter[token]
+
+
+class ViewIndex:
+    def __init__(self):
+        self.change_count = -1
+        self.lines: List[str] = list()
+        self.line_tokens: List[List[str]] = list()
+        self.token_counts: Counter = Counter()
+        # Jomini script tokens of each line, strings and comments are single tokens so braces inside of them are skipped
+        self.line_script_tokens: List[List[LineToken]] = list()
+        # Built from the script tokens the first time it is needed, then only the blocks that are edited are parsed again.
+        # None if it has to be built again because braces were added or removed.
+        self.tree: Optional[ParseTree] = None
+        # Token -> rows it is on, built from line_tokens the first time it is needed and then kept up to date
+        self.token_lines: Dict[str, Set[int]] = dict()
+        self.token_lines_dirty = True
+        # Name -> (change_count, value) of values that are computed once per change of the buffer
+        self.memos: Dict[str, Tuple[int, Any]] = dict()
+        self.lock = threading.RLock()
+
+    def rebuild(self, view: sublime.View):
+        with self.lock:
+            text = view.substr(sublime.Region(0, view.size()))
+            self.replace_lines(0, len(self.lines), text.split("\n"))
+            self.change_count = view.change_count()
+
+    def apply_text_changes(self, changes: List[sublime.TextChange], change_count: int):
+        """
+        Apply the changes from a TextChangeListener in order
+        If the index doesn't match the buffer the changes were made to it is marked as out of date instead
+        """
+        with self.lock:
+            if not changes or changes[0].a.change_count != self.change_count:
+                self.change_count = -1
+                return
+
+            for change in changes:
+                a = change.a
+                b = change.b
+                if b.row >= len(self.lines):
+                    self.change_count = -1
+                    return
+
+                prefix = self.lines[a.row][: a.col]
+                suffix = self.lines[b.row][b.col :]
+                new_lines = (prefix + change.str + suffix).split("\n")
+                self.replace_lines(a.row, b.row + 1, new_lines)
+
+            self.change_count = change_count
+
+    def replace_lines(self, start: int, end: int, new_lines: List[str]):
+        """Replace the lines from start up to end with new_lines and update everything derived from them"""
+        for tokens in self.line_tokens[start:end]:
+            remove_tokens(self.token_counts, tokens)
+            remove_tokens(workspace_token_counts, tokens)
+
+        new_tokens = [word_re.findall(x) for x in new_lines]
+        for tokens in new_tokens:
+            add_tokens(self.token_counts, tokens)
+            add_tokens(workspace_token_counts, tokens)
+
+        if not self.token_lines_dirty:
+            self.update_token_lines(start, end, new_tokens)
+
+        new_script_tokens = [tokenize_line(x) for x in new_lines]
+        old_script_tokens = self.line_script_tokens[start:end]
+        # The blocks only change if a line with brackets was edited,
+        # the key of a block can also change if the block starts within a few tokens after the edited lines
+        block = None
+        if self.tree is not None:
+            if (
+                self.tree.has_unclosed_blocks
+                or start == end
+                or any(has_brackets(x) for x in old_script_tokens)
+                or any(has_brackets(x) for x in new_script_tokens)
+                or self.is_block_key_after(end)
+            ):
+                self.tree = None
+            else:
+                block = self.tree.get_block_containing_row(start)
+
+        self.lines[start:end] = new_lines
+        self.line_tokens[start:end] = new_tokens
+        self.line_script_tokens[start:end] = new_script_tokens
+
+        if self.tree is not None and block is not None:
+            # Only the block the edit was in is parsed again, everything after it is moved by the lines that were added or removed
+            delta = len(new_lines) - (end - start)
+            if delta:
+                self.tree.shift_rows(end, delta)
+            self.tree.reparse_block(self.line_script_tokens, block)
+
+    def is_block_key_after(self, row: int) -> bool:
+        """
+        Check if the first brace from row on is a { with less than 3 tokens before it, so its key can be on an earlier row
+        """
+        count = 0
+        for i in range(row, len(self.line_script_tokens)):
+            for token in self.line_script_tokens[i]:
+                if token[1] == OPEN:
+                    return True
+                if token[1] == CLOSE:
+                    return False
+                count += 1
+                if count >= 3:
+                    return False
+        return False
+
+    def get_tree(self) -> ParseTree:
+        with self.lock:
+            if self.tree is None:
+                self.tree = ParseTree(self.line_script_tokens)
+            return self.tree
+
+    def get_enclosing_brackets(self, row: int, col: int) -> List[Tuple[int, int]]:
+        """
+        Return the positions of the { of every block that contains row and col, innermost first
+        """
+        with self.lock:
+            blocks = self.get_tree().get_enclosing_blocks(row, col)
+            return [x.open for x in blocks]  # type: ignore
+
+    def get_key_path(self, row: int, col: int) -> List[Optional[str]]:
+        """
+        Return the keys of the blocks that contain row and col from the outermost to the innermost
+        """
+        with self.lock:
+            blocks = self.get_tree().get_enclosing_blocks(row, col)
+            return [x.key for x in reversed(blocks)]
+
+    def update_token_lines(self, start: int, end: int, new_tokens: List[List[str]]):
+        """
+        Update the inverted index for the lines from start up to end being replaced by lines with new_tokens
+        Must be called before line_tokens is updated, the rows after end are moved by the lines that were added or removed.
+        """
+        for row in range(start, end):
+            for token in self.line_tokens[row]:
+                rows = self.token_lines.get(token)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self.token_lines[token]
+
+        delta = len(new_tokens) - (end - start)
+        if delta:
+            # Only the tokens on the rows after the edit have rows to move
+            moved = {x for tokens in self.line_tokens[end:] for x in tokens}
+            for token in moved:
+                self.token_lines[token] = {
+                    x + delta if x >= end else x for x in self.token_lines[token]
+                }
+
+        for row, tokens in enumerate(new_tokens, start):
+            for token in tokens:
+                self.token_lines.setdefault(token, set()).add(row)
+
+    def rebuild_token_lines(self):
+        token_lines: Dict[str, Set[int]] = dict()
+        for row, tokens in enumerate(self.line_tokens):
+            for token in tokens:
+                token_lines.setdefault(token, set()).add(row)
+        self.token_lines = token_lines
+        self.token_lines_dirty = False
+
+    def find_lines(self, key: str) -> List[int]:
+        """
+        Return the sorted rows where key is found as a whole word
+        Keys that are a single word are looked up in the inverted index,
+        other keys are only searched for on the rows that have the least common word in the key.
+        """
+        with self.lock:
+            if self.token_lines_dirty:
+                self.rebuild_token_lines()
+
+            if word_re.fullmatch(key):
+                return sorted(self.token_lines.get(key, ()))
+
+            key_re = re.compile(r"\b" + re.escape(key) + r"\b")
+            parts = word_re.findall(key)
+            if parts:
+                rows: Iterable[int] = min(
+                    (self.token_lines.get(x, set()) for x in parts), key=len
+                )
+            else:
+                rows = range(len(self.lines))
+            return sorted(x for x in rows if key_re.search(self.lines[x]))
+
+    def memoize(self, view: sublime.View, name: str, func: Callable[[], Any]) -> Any:
+        """
+        Return the result of func, it is only called again after the buffer of view changes
+        """
+        change_count = view.change_count()
+        memo = self.memos.get(name)
+        if memo is not None and memo[0] == change_count:
+            return memo[1]
+
+        value = func()
+        self.memos[name] = (change_count, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.replace_lines(0, len(self.lines), [])
+            self.memos.clear()
+            self.change_count = -1
+
+
+# Buffer id -> ViewIndex
+view_indexes: Dict[int, ViewIndex] = dict()
+
+
+def get_view_index(view: sublime.View) -> ViewIndex:
+    """
+    Get the index for the buffer of view, the index is created or rebuilt if it doesn't match the current buffer
+    """
+    buffer_id = view.buffer_id()
+    index = view_indexes.get(buffer_id)
+    if index is None:
+        index = ViewIndex()
+        view_indexes[buffer_id] = index
+
+    if index.change_count != view.change_count():
+        index.rebuild(view)
+
+    return index
+
+
+def update_view_index(buffer: sublime.Buffer, changes: List[sublime.TextChange]):
+    # Only buffers that have been indexed already are kept up to date
+    index = view_indexes.get(buffer.id())
+    if index is None:
+        return
+
+    view = buffer.primary_view()
+    if view is None:
+        return
+
+    index.apply_text_changes(changes, view.change_count())
+
+
+def remove_view_index(view: sublime.View):
+    # Other views can still be showing the same buffer
+    if [x for x in view.buffer().views() if x.id() != view.id()]:
+        return
+
+    index = view_indexes.pop(view.buffer_id(), None)
+    if index is not None:
+        index.clear()
@@ -0,0 +1,150 @@
+"""
+Check the parse tree of the view index against a full parse after edits, and its blocks against plain bracket matching.
+The modules are loaded without the package __init__ so they can be imported outside of Sublime Text.
+"""
+
+import bisect
+import importlib
+import os
+import random
+import sys
+import types
+
+sublime = sys.modules.setdefault("sublime", types.ModuleType("sublime"))
+# Only used in annotations by the view index
+for name in ("View", "Buffer", "TextChange", "Region"):
+    if not hasattr(sublime, name):
+        setattr(sublime, name, object)
+package = types.ModuleType("jomini_tools_src")
+package.__path__ = [os.path.join(os.path.dirname(__file__), "..", "src")]  # type: ignore
+sys.modules.setdefault("jomini_tools_src", package)
+parse_tree = importlib.import_module("jomini_tools_src.parse_tree")
+script_tokens = importlib.import_module("jomini_tools_src.script_tokens")
+view_index = importlib.import_module("jomini_tools_src.view_index")
+
+pieces = ["a", "b", " = ", "{", "}", "\n", "\n", "x = 1\n", "c = { d = e }\n"]
+pieces += ['"s{"', " ", "# c {\n", "hsv", " < "]
+
+
+class Position:
+    def __init__(self, row, col, change_count=0):
+        self.row = row
+        self.col = col
+        self.change_count = change_count
+
+
+class TextChange:
+    def __init__(self, a, b, text):
+        self.a = a
+        self.b = b
+        self.str = text
+
+
+def random_text(rng, count, choices=pieces):
+    return "".join(rng.choice(choices) for _ in range(count))
+
+
+def get_nodes(node, depth=0, nodes=None):
+    nodes = [] if nodes is None else nodes
+    for x in node.children:
+        nodes.append((depth, x.key, x.operator, x.value, x.value_start))
+        nodes[-1] += (x.start, x.end, x.open)
+        get_nodes(x, depth + 1, nodes)
+    return nodes
+
+
+def get_bracket_enclosing(lines):
+    """
+    Return a function that finds the enclosing { positions by matching brackets
+    """
+    opens, closes, parents, close_to_open, stack = [], [], [], {}, []
+    for row, line in enumerate(lines):
+        for col, kind, _ in script_tokens.tokenize_line(line):
+            if kind == script_tokens.OPEN:
+                parents.append(stack[-1] if stack else -1)
+                stack.append(len(opens))
+                opens.append((row, col))
+                closes.append(None)
+            elif kind == script_tokens.CLOSE and stack:
+                i = stack.pop()
+                closes[i] = (row, col)
+                close_to_open[(row, col)] = i
+
+    def enclosing(row, col):
+        found = []
+        i = bisect.bisect_right(opens, (row, col)) - 1
+        while i >= 0:
+            close = closes[i]
+            if close is not None and (row, col) <= (close[0], close[1] + 1):
+                found.append(i)
+            i = parents[i]
+        previous = close_to_open.get((row, col - 1))
+        if previous is not None and previous not in found:
+            found.insert(0, previous)
+        return [opens[x] for x in found]
+
+    return enclosing
+
+
+def make_index(text):
+    index = view_index.ViewIndex()
+    index.change_count = 0
+    index.replace_lines(0, 0, text.split("\n"))
+    return index
+
+
+def random_edit(rng, index, choices):
+    lines = index.lines
+    row = rng.randrange(len(lines))
+    col = rng.randint(0, len(lines[row]))
+    end_row = rng.randint(row, min(len(lines) - 1, row + 2))
+    end_col = rng.randint(col if end_row == row else 0, len(lines[end_row]))
+    change = TextChange(
+        Position(row, col, index.change_count),
+        Position(end_row, end_col),
+        random_text(rng, rng.randint(0, 3), choices),
+    )
+    index.apply_text_changes([change], index.change_count + 1)
+
+
+def test_statements_and_values():
+    tree = make_index('a = b\nc = {\n\td > 2 "e"\n}\ncolor = hsv { 1 }').get_tree()
+    nodes = tree.root.children
+    assert [(x.key, x.operator, x.value) for x in nodes] == [
+        ("a", "=", "b"),
+        ("c", "=", None),
+        ("color", "=", "hsv"),
+    ]
+    assert nodes[1].open == (1, 4) and nodes[1].end == (3, 1)
+    assert [(x.key, x.value, x.value_start) for x in nodes[1].children] == [
+        ("d", "2", (2, 5)),
+        (None, '"e"', (2, 7)),
+    ]
+    assert [x.value for x in nodes[2].children] == ["1"]
+    assert [x.key for x in tree.get_enclosing_blocks(2, 3)] == ["c"]
+
+
+def test_blocks_match_brackets():
+    rng = random.Random(0)
+    for _ in range(300):
+        index = make_index(random_text(rng, rng.randint(0, 60)))
+        enclosing = get_bracket_enclosing(index.lines)
+        for row, line in enumerate(index.lines):
+            for col in range(len(line) + 2):
+                assert index.get_enclosing_brackets(row, col) == enclosing(row, col)
+
+
+def test_edits_match_full_parse():
+    rng = random.Random(1)
+    # Edits without braces only parse the block they are in again
+    choices = [x for x in pieces if "{" not in x and "}" not in x]
+    for i in range(600):
+        text = "a = {\n b = c\n d = { e f\n }\n}\n" * 3 + random_text(rng, 20)
+        index = make_index(text)
+        index.get_tree()
+        for _ in range(6):
+            random_edit(rng, index, choices if i % 2 else pieces)
+            if rng.random() < 0.7:
+                index.get_tree()
+        full = parse_tree.ParseTree(index.line_script_tokens)
+        assert get_nodes(index.get_tree().root) == get_nodes(full.root)
@@ -0,0 +1,92 @@
+"""
+Check that the prefix factored rules from write_syntax match exactly what the old flat alternations matched.
+The modules are loaded without the package __init__ so they can be imported outside of Sublime Text.
+"""
+
+import importlib
+import os
+import random
+import re
+import sys
+import types
+
+# game_objects imports sublime but write_syntax doesn't use it
+sys.modules.setdefault("sublime", types.ModuleType("sublime"))
+package = types.ModuleType("jomini_tools_src")
+package.__path__ = [os.path.join(os.path.dirname(__file__), "..", "src")]  # type: ignore
+sys.modules.setdefault("jomini_tools_src", package)
+game_objects = importlib.import_module("jomini_tools_src.game_objects")
+
+rule_re = re.compile(r"- match: (.*)\n")
+
+
+def get_rules(keys):
+    game_objects.syntax_section_cache.clear()
+    return rule_re.findall(game_objects.write_syntax(keys, "Test", "test") + "\n")
+
+
+def get_old_rules(keys):
+    # The old output, 75 keys per rule with an empty alternative at the end
+    return [rf"\b({'|'.join(keys[i : i + 75])}|)\b" for i in range(0, len(keys), 75)]
+
+
+def get_spans(rules, text):
+    spans = set()
+    for rule in rules:
+        for match in re.finditer(rule, text):
+            # The empty alternative of the old rules only matched empty strings
+            if match.end() > match.start():
+                spans.add(match.span())
+    return spans
+
+
+def assert_equivalent(keys, probes):
+    text = " ".join(probes) + "\n" + ".".join(probes) + "\n" + ":".join(probes)
+    assert get_spans(get_rules(keys), text) == get_spans(get_old_rules(keys), text)
+
+
+def random_words(rng, count, alphabet="ab_c1", max_length=6):
+    return [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(1, max_length)))
+        for _ in range(count)
+    ]
+
+
+def test_random_keys():
+    rng = random.Random(0)
+    keys = sorted(set(random_words(rng, 5000, max_length=8)))
+    probes = random_words(rng, 20000, max_length=9) + keys
+    assert_equivalent(keys, probes)
+
+
+def test_shared_prefixes():
+    keys = ["add_gold", "add_prestige", "add_trait", "add_trait_xp", "remove_trait"]
+    probes = keys + ["add", "add_", "add_gol", "add_golds", "add_trait_x", "trait"]
+    assert_equivalent(keys, probes)
+
+
+def test_keys_that_are_prefixes_of_other_keys():
+    keys = ["a", "ab", "abc", "abcd", "b", "ba"]
+    probes = keys + ["abcde", "abd", "bab", "c", "aa"]
+    assert_equivalent(keys, probes)
+
+
+def test_regex_metacharacters():
+    # Keys that aren't plain words are written as they are, the same as before
+    keys = ["scope:x", "a.b", "culture:roman", "x+", "plain_key"]
+    probes = ["scope:x", "scope:y", "a.b", "axb", "culture:roman", "x", "xx", "plain"]
+    probes.append("plain_key")
+    assert_equivalent(keys, probes)
+
+
+def test_long_rules_are_split():
+    rng = random.Random(1)
+    keys = sorted(set(random_words(rng, 3000, alphabet="abcdefgh_", max_length=12)))
+    rules = get_rules(keys)
+    assert len(rules) > 1
+    assert all(len(x) <= game_objects.MAX_SYNTAX_REGEX_LENGTH + 8 for x in rules)
+    assert_equivalent(keys, keys + random_words(rng, 5000, "abcdefgh_", 13))
+
+
+def test_empty_set():
+    assert get_rules([]) == []